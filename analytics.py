@@ -0,0 +1,297 @@
+"""Opt-in, anonymised usage analytics on a single box.
+
+    python analytics.py compact
+    python analytics.py report
+    python analytics.py bench --records 2000000
+
+Off unless the app runs with ANALYTICS=1. Then it appends one JSON line per
+opted-in result to ANALYTICS_DIR/events.jsonl. A line holds the inputs and
+the emissions breakdown, the country, the diet and the hour it was recorded.
+It carries no names or places. The only id is a submission number drawn at
+random once per browser session, unrelated to Streamlit's session id, so a
+user who changes their answers counts once.
+
+`compact` rolls the log into columnar .npz partitions, one directory per day,
+storing the text columns as small integer codes plus their labels. load()
+reads them back into one array per column, and group_stats() computes
+per-group statistics on those codes with sorting and bincount rather than
+Python loops.
+"""
+import argparse
+import glob
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from countries import available_countries, load_country
+from emissions import CATEGORIES
+from household import SCALAR_FIELDS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ANALYTICS_DIR = os.environ.get("ANALYTICS_DIR", os.path.join(BASE_DIR, "analytics"))
+ENABLED = os.environ.get("ANALYTICS", "0") == "1"
+
+LOG_NAME = "events.jsonl"
+PARTITIONS = "partitions"
+# Time for appends already under way to land in a log that has just been rotated
+ROTATE_GRACE = 1.0
+
+# Column -> dtype of a compacted partition; the log lines use the same names
+COLUMNS = {
+    "time": "<i8",  # unix seconds, truncated to the hour
+    "submission": "<i8",
+    "country": "<U2",
+    "diet": "<U32",
+    "people_count": "<u2",
+    **{name: "<f8" for name in SCALAR_FIELDS},
+    "n_cars": "u1",
+    "car_km": "<f8",
+    "n_motorcycles": "u1",
+    "motorcycle_km": "<f8",
+    **{category.lower(): "<f8" for category in CATEGORIES},
+    "total": "<f8",
+}
+# Text columns stored as codes into a "<name>_labels" array
+CATEGORICAL = ("country", "diet")
+
+_append_lock = threading.Lock()
+
+
+def new_submission_id():
+    return secrets.randbits(63)
+
+
+def make_event(household, emissions, total, country, diet, submission, now=None):
+    """One anonymised log line's worth of data for a scored household."""
+    now = time.time() if now is None else now
+    return {
+        "time": int(now) // 3600 * 3600,
+        "submission": submission,
+        "country": country,
+        "diet": diet,
+        "people_count": household.people_count,
+        **{name: getattr(household, name) for name in SCALAR_FIELDS},
+        "n_cars": len(household.cars),
+        "car_km": sum(car.distance_km for car in household.cars),
+        "n_motorcycles": len(household.motorcycle),
+        "motorcycle_km": sum(bike.distance_km for bike in household.motorcycle),
+        **{category.lower(): emissions[category] for category in CATEGORIES},
+        "total": total,
+    }
+
+
+def record(event, root=ANALYTICS_DIR):
+    """Append one event to the log."""
+    os.makedirs(root, exist_ok=True)
+    line = json.dumps(event, separators=(",", ":")) + "\n"
+    # Opened per event, so after compact() renames the log the next event starts a new one
+    with _append_lock, open(os.path.join(root, LOG_NAME), "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def _columns_from_events(events):
+    return {name: np.array([event.get(name, "" if dtype.startswith("<U") else 0) for event in events], dtype=dtype)
+            for name, dtype in COLUMNS.items()}
+
+
+def _write_partition(columns, root):
+    day = datetime.fromtimestamp(int(columns["time"][0]), tz=timezone.utc).strftime("%Y-%m-%d")
+    directory = os.path.join(root, PARTITIONS, f"day={day}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{time.time_ns()}.npz")
+    encoded = dict(columns)
+    for name in CATEGORICAL:
+        labels, codes = np.unique(columns[name], return_inverse=True)
+        encoded[name] = codes.ravel().astype(np.uint16)
+        encoded[f"{name}_labels"] = labels
+    # Written under a temporary name so load() never sees a partial partition
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, **encoded)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def compact(root=ANALYTICS_DIR):
+    """Move everything logged so far into per-day partitions; returns the number of events."""
+    active = os.path.join(root, LOG_NAME)
+    if os.path.exists(active):
+        # New appends go to a fresh log while this one is compacted
+        os.replace(active, os.path.join(root, f"events.{time.time_ns()}.jsonl"))
+        time.sleep(ROTATE_GRACE)
+
+    compacted = 0
+    for rotated in sorted(glob.glob(os.path.join(root, "events.*.jsonl"))):
+        with open(rotated, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        if events:
+            columns = _columns_from_events(events)
+            days = columns["time"] // 86400
+            for day in np.unique(days):
+                mask = days == day
+                _write_partition({name: values[mask] for name, values in columns.items()}, root)
+            compacted += len(events)
+        os.remove(rotated)
+    return compacted
+
+
+def load(root=ANALYTICS_DIR, columns=None, since=None, latest_only=True):
+    """All compacted events as {column: array}, oldest first.
+
+    Categorical columns come back as codes, with their labels under
+    "<name>_labels". since is a "YYYY-MM-DD" day to start from. With
+    latest_only, each submission keeps only its last recorded result.
+    """
+    names = list(COLUMNS) if columns is None else list(dict.fromkeys(["submission", *columns]))
+    parts = {name: [] for name in names}
+    for directory in sorted(glob.glob(os.path.join(root, PARTITIONS, "day=*"))):
+        if since is not None and directory.rsplit("day=", 1)[1] < since:
+            continue
+        for path in sorted(glob.glob(os.path.join(directory, "part-*.npz"))):
+            with np.load(path) as part:
+                for name in names:
+                    parts[name].append((part[f"{name}_labels"], part[name]) if name in CATEGORICAL else part[name])
+
+    data, labels = {}, {}
+    for name, chunks in parts.items():
+        if name not in CATEGORICAL:
+            data[name] = np.concatenate(chunks) if chunks else np.empty(0, dtype=COLUMNS[name])
+            continue
+        if not chunks:
+            data[name], labels[f"{name}_labels"] = np.empty(0, dtype=np.uint16), np.empty(0, dtype=COLUMNS[name])
+            continue
+        # Each partition has its own labels; recode them all into one sorted set
+        merged = np.unique(np.concatenate([chunk_labels for chunk_labels, _ in chunks]).astype(COLUMNS[name]))
+        data[name] = np.concatenate([np.searchsorted(merged, chunk_labels).astype(np.uint16)[codes]
+                                     for chunk_labels, codes in chunks])
+        labels[f"{name}_labels"] = merged
+    if latest_only and len(data["submission"]):
+        # np.unique keeps the first occurrence, so look from the newest end
+        _, last = np.unique(data["submission"][::-1], return_index=True)
+        keep = np.sort(len(data["submission"]) - 1 - last)
+        data = {name: values[keep] for name, values in data.items()}
+    return {**data, **labels}
+
+
+def _group_codes(data, name):
+    """Integer code per row, and the label of each code, for one group-by column."""
+    labels = data.get(f"{name}_labels")
+    if labels is not None:
+        return data[name].astype(np.intp), labels
+    labels, codes = np.unique(data[name], return_inverse=True)
+    return codes.ravel(), labels
+
+
+def group_stats(data, by, value, percentiles=(50, 90)):
+    """Per-group count, mean, std, min, max and percentiles of one column.
+
+    by is a column name or a list of them. Returns a dict of arrays with one
+    entry per group: the group key column(s), then the statistics.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    values = np.asarray(data[value], dtype=np.float64)
+    column_codes, labels = zip(*(_group_codes(data, name) for name in by))
+    shape = [len(column_labels) for column_labels in labels]
+    # One integer per combination of keys, so grouping never sorts strings
+    present, codes = np.unique(np.ravel_multi_index(column_codes, shape), return_inverse=True)
+    codes = codes.ravel()
+    groups = len(present)
+
+    count = np.bincount(codes, minlength=groups)
+    total = np.bincount(codes, weights=values, minlength=groups)
+    mean = total / np.maximum(count, 1)
+    squares = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=groups)
+
+    # Sorting by (group, value) lines every group's values up in order, for min/max/percentiles
+    order = np.lexsort((values, codes))
+    start = np.concatenate([[0], np.cumsum(count)[:-1]])
+    ordered = values[order]
+    result = {name: column_labels[key]
+              for name, column_labels, key in zip(by, labels, np.unravel_index(present, shape))}
+    result.update(count=count, mean=mean, std=np.sqrt(squares / np.maximum(count, 1)),
+                  min=ordered[start], max=ordered[start + count - 1])
+    for q in percentiles:
+        # Nearest-rank percentile within each group
+        rank = np.ceil(q / 100 * count).astype(np.int64) - 1
+        result[f"p{q}"] = ordered[start + np.clip(rank, 0, count - 1)]
+    return result
+
+
+def shares(data, by, column):
+    """Fraction of each `by` group taking each value of `column`, e.g. diet mix per country."""
+    stats = group_stats(data, [by, column], "total", percentiles=())
+    per_group = group_stats(data, by, "total", percentiles=())
+    group_totals = dict(zip(per_group[by], per_group["count"]))
+    return {
+        by: stats[by],
+        column: stats[column],
+        "share": stats["count"] / np.array([group_totals[key] for key in stats[by]]),
+    }
+
+
+def _print_table(title, table):
+    print(f"\n{title}")
+    names = list(table)
+    print("".join(f"{name:>16}" for name in names))
+    for row in zip(*table.values()):
+        print("".join(f"{value:>16.3f}" if isinstance(value, (float, np.floating)) else f"{value!s:>16}"
+                      for value in row))
+
+
+def report(root=ANALYTICS_DIR):
+    data = load(root)
+    if not len(data["total"]):
+        print("No compacted events yet; run `python analytics.py compact` first")
+        return
+    print(f"{len(data['total'])} submissions")
+    _print_table("Total tCO₂e by country", group_stats(data, "country", "total"))
+    for category in CATEGORIES:
+        _print_table(f"{category} tCO₂e by country", group_stats(data, "country", category.lower(), percentiles=()))
+    data["flies"] = (data["flight_distance"] > 0).astype(np.float64)
+    _print_table("Share of users who flew", {key: value for key, value in group_stats(
+        data, "country", "flies", percentiles=()).items() if key in ("country", "count", "mean")})
+    _print_table("Diet mix", shares(data, "country", "diet"))
+
+
+def _synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {name: np.zeros(n, dtype=dtype) for name, dtype in COLUMNS.items()}
+    data["submission"] = rng.integers(0, 2 ** 62, n)
+    for name in CATEGORICAL:
+        data[f"{name}_labels"] = np.array(load_country().diets if name == "diet" else sorted(available_countries()))
+        data[name] = rng.integers(0, len(data[f"{name}_labels"]), n).astype(np.uint16)
+    for category in CATEGORIES:
+        data[category.lower()] = rng.gamma(2, 0.5, n)
+    data["total"] = sum(data[category.lower()] for category in CATEGORIES)
+    data["flight_distance"] = np.where(rng.random(n) < 0.3, rng.uniform(500, 15000, n), 0)
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact and summarise the anonymised analytics log.")
+    parser.add_argument("command", choices=["compact", "report", "bench"])
+    parser.add_argument("--dir", default=ANALYTICS_DIR)
+    parser.add_argument("--records", type=int, default=1_000_000, help="synthetic records for bench")
+    args = parser.parse_args(argv)
+
+    if args.command == "compact":
+        print(f"compacted {compact(args.dir)} events into {os.path.join(args.dir, PARTITIONS)}")
+    elif args.command == "report":
+        report(args.dir)
+    else:
+        data = _synthetic(args.records)
+        for label, run in (("total by country", lambda: group_stats(data, "country", "total")),
+                           ("total by country and diet", lambda: group_stats(data, ["country", "diet"], "total")),
+                           ("diet mix per country", lambda: shares(data, "country", "diet"))):
+            start = time.perf_counter()
+            run()
+            print(f"{label:<28}{args.records:>12,} records in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
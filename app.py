@@ -1,13 +1,18 @@
 import streamlit as st
-from streamlit_extras.stylable_container import stylable_container
 import streamlit.components.v1 as components
-import pandas as pd
-from geopy.distance import geodesic
-import base64
-from scipy import stats
-import numpy as np
-from typing import Literal
-from streamlit.components.v1 import html
+import asyncio
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from functools import partial
+from geocoding import CoordinateCache, get_geocoder, resolve_legs
+from routing import load_road_graph
+from analytics import ENABLED as ANALYTICS_ENABLED, make_event, new_submission_id, record
+from emissions import CATEGORIES, calculate_emissions, user_percentile
+from airports import AIRPORTS, airport_distance_km
+from countries import DEFAULT_COUNTRY, available_countries, load_country, percentile_reference
+from report import render_household
+from secondary_table import answer_indices, secondary_emissions
+from state_codec import DEFAULT_TOKEN, QUERY_PARAM, decode_state, encode_state
+from household import MAX_PEOPLE, MAX_VEHICLES, Household, Vehicle
 
 
 # CSS for scroll blur effect
@@ -181,6 +186,46 @@ def selectbox_style():
         </style>
     """, unsafe_allow_html=True)
 
+def diet_button_style():
+    st.markdown("""
+        <style>
+        [class*="st-key-diet_button_"] [data-testid="stButton"] button {
+            background-color: #f0f0f0;
+            color: black;
+            border: 1px solid #ccc;
+            border-radius: 6px;
+            margin-bottom: 16px;
+            transition: all 0.2s ease;
+        }
+        [class*="st-key-diet_button_"][class*="_selected"] [data-testid="stButton"] button {
+            background-color: #4CAF50;
+            color: white;
+            border: 1px solid #4CAF50;
+        }
+        [class*="st-key-diet_button_"] [data-testid="stButton"] button:hover {
+            background-color: #45a049 !important;
+            color: white !important;
+            border-color: #45a049 !important;
+        }
+        [class*="st-key-diet_button_"] [data-testid="stButton"] button:active {
+            background-color: #3e8e41 !important;
+            color: white !important;
+            border-color: #3e8e41 !important;
+            transform: scale(0.98);
+        }
+        [class*="st-key-diet_button_"] [data-testid="stButton"] button:focus {
+            outline: none !important;
+            box-shadow: none !important;
+        }
+        [class*="st-key-diet_button_"] [data-testid="stButton"] button:focus,
+        [class*="st-key-diet_button_"] [data-testid="stButton"] button:focus-visible {
+            color: white !important;
+            border-color: #3e8e41 !important;
+            box-shadow: none !important;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+
 def radio_style(margin):
     st.markdown(f"""
         <style>
@@ -202,84 +247,158 @@ def radio_style(margin):
     </style>
     """, unsafe_allow_html=True)
 
-def calculate_emissions(data):
-    factors = {
-        'electricity': 0.5004, # kg CO2e per kWh
-        'gas': 2.2, # kg CO2e per m³
-        'fuel': 2.7, # kg CO2e per litre of petrol
-        'bus': 0.1234, # kg CO2e per km per passenger
-        'flights': 0.115, # kg CO2e per km per passenger
-    }
-
-    electricity = data.get('electricity', 0)
-    gas = data.get('gas', 0)
-    people = max(data.get('people_count', 1), 1)  # Avoid division by 0
-
+@st.cache_resource
+def load_geocoder():
+    # One gazetteer/geopy client and one coordinate cache shared by all sessions
+    return get_geocoder(), CoordinateCache()
+
+@st.cache_resource
+def load_cached_road_graph():
+    # None when no road graph has been built (see routing.py)
+    return load_road_graph()
+
+def routes_annual_km(key_prefix):
+    # Yearly distance from frequent trips (home -> work, etc.) routed on the road graph
+    num_routes = st.number_input("Number of frequent routes", min_value=1, max_value=5, value=1, step=1, key=f"{key_prefix}_num_routes")
+    routes = []
+    for j in range(num_routes):
+        cols = st.columns([3, 3, 2])
+        with cols[0]:
+            origin = st.text_input(f"From (Route {j + 1})", placeholder="e.g. Rawalpindi", key=f"{key_prefix}_from_{j}").strip() or None
+        with cols[1]:
+            destination = st.text_input(f"To (Route {j + 1})", placeholder="e.g. Islamabad", key=f"{key_prefix}_to_{j}").strip() or None
+        with cols[2]:
+            trips = st.number_input(f"Trips per year (Route {j + 1})", min_value=0, value=480, step=1, key=f"{key_prefix}_trips_{j}", help="Count each direction as one trip")
+        routes.append((origin, destination, trips))
+
+    geocoder, coordinate_cache = load_geocoder()
+    route_coords = asyncio.run(resolve_legs([(origin, destination) for origin, destination, _ in routes], geocoder, coordinate_cache))
+    road_graph = load_cached_road_graph()
+
+    annual_km = 0
+    for (origin, destination, trips), (start, end) in zip(routes, route_coords):
+        if origin is None or destination is None:
+            continue
+        if start is None or end is None:
+            st.warning(f"Couldn't find {origin if start is None else destination}. Try a nearby larger city.")
+            continue
+        route_km = road_graph.route_km(start, end)
+        if route_km is None:
+            st.warning(f"No road route found between {origin} and {destination}.")
+            continue
+        annual_km += route_km * trips
+    st.markdown(f"Your routes add up to **{annual_km:,.0f} km** per year")
+    return annual_km
+
+@st.cache_data
+def leg_distance_km(dep_coords, arr_coords):
+    # Airport pairs come from the matrix baked into the image; geopy is only loaded for typed-in cities
+    distance = airport_distance_km(dep_coords, arr_coords)
+    if distance is None:
+        from geopy.distance import geodesic
+        distance = geodesic(dep_coords, arr_coords).km
+    return distance
+
+@st.cache_data
+def cached_percentile(total_emissions, country_code):
+    return user_percentile(total_emissions, percentile_reference(country_code))
+
+def select_diet(diet):
+    st.session_state["diet_type"] = diet
+
+def switch_country(previous_code):
+    # Keep each answer at the same bucket in the new currency, and drop airports the new country doesn't list
+    previous, current = load_country(previous_code), load_country(st.session_state["country"])
+    for key in ("clothing_range", "furniture_range", "recreation_range"):
+        if st.session_state.get(key) in previous.spending_ranges:
+            st.session_state[key] = current.buckets[previous.buckets.index(st.session_state[key])]
+    for key in [key for key in st.session_state if str(key).startswith(("dep_", "arr_"))]:
+        if not str(key).startswith(("dep_name_", "arr_name_")) and st.session_state[key] not in current.airports:
+            del st.session_state[key]
+
+def sync_profile_link(fragment=False):
+    # Keep the address bar in sync so the page link always reopens these answers. Once per run:
+    # at the end of a full run, or at the end of the one fragment that reran on its own
+    ctx = get_script_run_ctx()
+    if fragment != bool(ctx is not None and ctx.fragment_ids_this_run):
+        return
+    profile_token = encode_state({key: st.session_state[key] for key in st.session_state})
+    if profile_token != DEFAULT_TOKEN:
+        st.query_params[QUERY_PARAM] = profile_token
+    elif QUERY_PARAM in st.query_params:
+        del st.query_params[QUERY_PARAM]
+
+def update_household(**fields):
+    # Widget values get the same validation as batch input; a rejected value leaves the record as it was
+    previous = {name: getattr(user_data, name) for name in fields}
+    for name, value in fields.items():
+        setattr(user_data, name, value)
     try:
-        electricity = float(electricity)
-    except (ValueError, TypeError):
-        electricity = 0
-
+        user_data.validate()
+    except (TypeError, ValueError) as e:
+        for name, value in previous.items():
+            setattr(user_data, name, value)
+        st.error(f"That value couldn't be used: {e}")
+
+def log_result(emissions, total_emissions):
+    # One random id per browser session, and one log line per distinct result
+    submission = st.session_state.setdefault("analytics_submission", new_submission_id())
+    event = make_event(user_data, emissions, total_emissions, country.code,
+                       st.session_state.get("diet_type", "Average (mixed)"), submission)
+    answers = {key: value for key, value in event.items() if key != "time"}
+    if answers == st.session_state.get("analytics_logged"):
+        return
     try:
-        gas = float(gas)
-    except (ValueError, TypeError):
-        gas = 0
-
-    # Household emissions per capita
-    total_household_emissions = (electricity * factors['electricity']) + (gas * factors['gas'])
-    household_emissions = total_household_emissions / people
-
-    emissions = {
-        'Household': household_emissions / 1000,
-        'Cars': sum((c['miles_driven'] / c['fuel_efficiency']) * factors['fuel'] for c in data.get('cars', [])) / 1000,
-        'Motorcycle': sum((b['miles_driven'] / b['fuel_efficiency']) * factors['fuel'] for b in data.get('motorcycle', [])) / 1000,
-        'Bus': data.get('bus', 0) * factors['bus'] / 1000,
-        'Flights': data.get('flight_distance', 0) * factors['flights']/1000,
-        'Secondary': sum(data.get(k, 0) for k in ['food', 'clothing', 'electronics', 'furniture', 'recreation']) / 1000
-    }
-
-    total = sum(emissions.values())  # to metric tonnes
-    return emissions, total
-
-def get_base64_image(image_path):
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
-
-def user_percentile(total_emissions):
-    # Simulate realistic income-based emissions distribution
-    np.random.seed(42)
-
-    low_income = np.random.normal(loc=0.9, scale=1.8, size=5000)        # 50%
-    middle_income = np.random.normal(loc=2.1, scale=1, size=4000)       # 40%
-    high_income = np.random.normal(loc=9, scale=3, size=1000)           # 10%
-
-    pakistan_emissions = np.concatenate([low_income, middle_income, high_income])
-    pakistan_emissions = pakistan_emissions[pakistan_emissions > 0]
-
-    user_percentile = stats.percentileofscore(pakistan_emissions, total_emissions)
+        record(event)
+    except OSError:
+        return
+    st.session_state["analytics_logged"] = answers
+
+def current_emissions():
+    # Secondary comes from the lookup table, exactly as the Secondary tab shows it; the rest from the formulas
+    emissions, _ = calculate_emissions(user_data, country.factors)
+    emissions["Secondary"] = float(secondary_emissions(answer_indices(st.session_state, country.code), country.code))
+    return emissions, sum(emissions[category] for category in CATEGORIES)
+
+def running_total():
+    # The one piece of the Total tab every input tab refreshes when it reruns
+    st.markdown(
+        f"<div style='text-align: center; color: gray; margin-top: 1rem;'>"
+        f"Running total: <b>{current_emissions()[1]:.2f} tCO₂e</b> · see the Total tab for the full breakdown</div>",
+        unsafe_allow_html=True
+    )
 
-    return max(user_percentile, 1)
+######################### Main Code #########################
 
-image_base64 = get_base64_image("footprint.png")
+# Shared links carry every answer in one token; apply it once, before any widget renders
+if "profile_loaded" not in st.session_state:
+    st.session_state["profile_loaded"] = True
+    if QUERY_PARAM in st.query_params:
+        try:
+            st.session_state.update(decode_state(st.query_params[QUERY_PARAM]))
+        except ValueError:
+            st.warning("This link's saved answers couldn't be read, so we've started from scratch.")
 
-######################### Main Code #########################
+# Profiles are cached per process, so this is a dictionary lookup after the first session
+st.session_state.setdefault("country", DEFAULT_COUNTRY)
+country = load_country(st.session_state["country"])
 
-st.set_page_config(page_title="🇵🇰 Carbon Footprint Calculator", layout="wide")
+st.set_page_config(page_title=f"{country.flag} Carbon Footprint Calculator", layout="wide")
 
 
 # Use markdown for the title with the effect
-st.markdown("""
+st.markdown(f"""
 <style>
-    .block-container {
+    .block-container {{
             padding-top: 0rem;
             padding-bottom: 0rem;
             padding-left: 2em;
             padding-right: 2rem;
             margin-top: -0.2rem;
-        }
+        }}
 </style>
 <div class="scroll-section">
-    <h1>🇵🇰 Carbon Footprint Calculator</h1>
+    <h1>{country.flag} Carbon Footprint Calculator</h1>
     <div style='font-size: 1.25rem; font-weight: 400; margin-bottom: 0.5rem; color: #222;'>
         Your personal carbon footprint dashboard!
     </div>        
@@ -294,13 +413,30 @@ st.markdown("""
 #     </div>
 # """, unsafe_allow_html=True)
 
-tabs_style()
-tabs = st.tabs(["Household", "Transport", "Secondary", "Total"])
+_, country_col = st.columns([4, 1])
+with country_col:
+    country_labels = available_countries()
+    # A new country changes factors, currency and airports everywhere, so it reruns the whole page
+    st.selectbox("Country", list(country_labels), format_func=country_labels.get, key="country",
+                 on_change=switch_country, args=(country.code,))
 
-user_data = {}
+# Shared styles go out once per page, outside the fragments, so fragment reruns don't resend them
+tabs_style()
+expander_style()
+selectbox_style()
+diet_button_style()
+# Switching tabs reruns the script so the Total tab is always current; widget
+# changes inside a tab only rerun that tab's fragment
+tabs = st.tabs(["Household", "Transport", "Secondary", "Total"], key="active_tab", on_change="rerun")
+
+# Every tab writes its own fields into the same record, which outlives fragment reruns
+if "user_data" not in st.session_state:
+    st.session_state["user_data"] = Household()
+user_data = st.session_state["user_data"]
 
 # --- Energy Tab ---
-with tabs[0]:
+@st.fragment
+def household_tab():
     st.markdown(
         "<h2 style='font-size: 2rem; font-weight: 700; margin-bottom: 0.5rem;'>⚡ Energy Emissions</h2>"
         "<h4 style='color: gray; font-size: 1.15rem;'>Add your household energy use details to estimate yearly CO₂e emissions.</h4>",
@@ -308,10 +444,9 @@ with tabs[0]:
     )
     _, col2, _ = st.columns(3)
     with col2:
-        people_count = st.number_input("How many people live in your household?", min_value=1, value=1, step=1, key='people_count')
-        user_data['people_count'] = people_count
+        people_count = st.number_input("How many people live in your household?", min_value=1, max_value=MAX_PEOPLE, value=1, step=1, key='people_count')
+        update_household(people_count=people_count)
     
-    expander_style()
     with st.expander("**➕ Electricity**"):
         col1, col2, col3 = st.columns([1.8, 2, 1])
         with col2:
@@ -324,18 +459,18 @@ with tabs[0]:
                                 horizontal=True,
                                 label_visibility="collapsed")
         if is_solar == "No":
-            net_electricty = st.number_input("Total household electricity consumption this year (units)", min_value=0, value=0, placeholder="Enter the number of units e.g. 10,000", format="%d")
-            user_data['electricity'] = net_electricty
+            net_electricty = st.number_input("Total household electricity consumption this year (units)", min_value=0, value=0, placeholder="Enter the number of units e.g. 10,000", format="%d", key="electricity_units")
+            update_household(electricity=net_electricty)
         else:
             solar_units = st.number_input("Total units generated by solar this year", 
                                             min_value=0, value=0, 
                                             placeholder="Enter the number of units e.g. 7,000", 
-                                            format="%d")
-            electricity_consumption = st.number_input("Total household electricity consumption this year (units)", min_value=0, value=0, placeholder="Enter the number of units e.g. 10,000", format="%d")
+                                            format="%d", key="solar_units")
+            electricity_consumption = st.number_input("Total household electricity consumption this year (units)", min_value=0, value=0, placeholder="Enter the number of units e.g. 10,000", format="%d", key="electricity_units")
             net_electricty = electricity_consumption - solar_units
             
-            user_data['electricity'] = max(net_electricty, 0)
-        elec_emissions = (user_data['electricity'] * 0.0005004) / people_count
+            update_household(electricity=max(net_electricty, 0))
+        elec_emissions = user_data.electricity * country.factors['electricity'] / people_count / 1000
         
         st.markdown(f"""
                 <div style='font-size: 1.2rem; font-weight: normal;'>
@@ -343,11 +478,10 @@ with tabs[0]:
                 </div>
             """, unsafe_allow_html=True)
     
-    expander_style()
     with st.expander("**➕ Natural Gas**"):
-            gas_consumption = st.number_input("Natural Gas (m³)", min_value=0, value=0, placeholder='e.g. 3,500', format="%d")
-            user_data['gas'] = gas_consumption
-            gas_emissions = (gas_consumption * 0.0022) / people_count
+            gas_consumption = st.number_input("Natural Gas (m³)", min_value=0, value=0, placeholder='e.g. 3,500', format="%d", key="gas_m3")
+            update_household(gas=gas_consumption)
+            gas_emissions = gas_consumption * country.factors['gas'] / people_count / 1000
             st.markdown(f"""
                 <div style='font-size: 1.2rem; font-weight: normal;'>
                     Estimated Emissions From Natural Gas Consumption: <span style='color:#4CAF50'>{gas_emissions:.2f}</span> tCO₂e
@@ -355,18 +489,25 @@ with tabs[0]:
             """, unsafe_allow_html=True)
 
 
-    if user_data['electricity'] is None or user_data['gas'] is None:
+    if user_data.electricity is None or user_data.gas is None:
         st.markdown(""" ⚠️ Please enter both electricity and gas usage to calculate household emissions.""")
-    elif isinstance(user_data['electricity'], (int, float)) and isinstance(user_data['gas'], (int, float)):
-        household_emissions = calculate_emissions(user_data)[0]['Household']
+    elif isinstance(user_data.electricity, (int, float)) and isinstance(user_data.gas, (int, float)):
+        household_emissions = calculate_emissions(user_data, country.factors)[0]['Household']
         st.markdown(
         f"<h4 style='color: #444; text-align: center; margin-top: 2rem;'>"
         f"⚡ Your Energy Carbon Footprint is <span style='color:#d43f3a'>{household_emissions:.2f}</span> tCO₂e</h4>",
         unsafe_allow_html=True
     )
 
+    running_total()
+    sync_profile_link(fragment=True)
+
+with tabs[0]:
+    household_tab()
+
 # --- Transport Tab ---
-with tabs[1]:
+@st.fragment
+def transport_tab():
     # Page Title
     st.markdown(
         "<h2 style='font-size: 2rem; font-weight: 700; margin-bottom: 0.5rem;'>🚘 Transport Emissions</h2>"
@@ -377,24 +518,29 @@ with tabs[1]:
     # CAR SECTION
     with st.container():
         st.markdown("### 🚗 Cars")
+        road_graph = load_cached_road_graph()
 
-        user_data['cars'] = []
+        update_household(cars=[])
 
-        expander_style()
         with st.expander("**➕ Add car details**"):
             car_cols = st.columns(3)
             with car_cols[1]:
-                num_cars = st.number_input("Number of Cars", min_value=0, value=0, step=1, key='num_cars', format="%d")
-            user_data['cars'] = []
+                num_cars = st.number_input("Number of Cars", min_value=0, max_value=MAX_VEHICLES, value=0, step=1, key='num_cars', format="%d")
+            cars = []
             for i in range(num_cars):
                 st.markdown(f"**Car {i+1}**", help="Enter annual distance and average efficiency")
+                use_routes = road_graph is not None and st.checkbox("Calculate distance from my frequent routes", key=f'car_use_routes_{i}')
                 cols = st.columns(2)
                 with cols[0]:
-                    miles = st.number_input("Kilometers Driven Per Year", min_value=0, value=15000, key=f'car_miles_{i}', format="%d")
+                    if not use_routes:
+                        miles = st.number_input("Kilometers Driven Per Year", min_value=0, value=15000, key=f'car_miles_{i}', format="%d")
                 with cols[1]:
                     efficiency = st.number_input("Fuel Efficiency (km/l)", min_value=1.0, value=12.0, key=f'car_eff_{i}')
-                user_data['cars'].append({'miles_driven': miles, 'fuel_efficiency': efficiency})
-            car_emissions = calculate_emissions(user_data)[0]['Cars']
+                if use_routes:
+                    miles = routes_annual_km(f'car_{i}')
+                cars.append(Vehicle(miles, efficiency))
+            update_household(cars=cars)
+            car_emissions = calculate_emissions(user_data, country.factors)[0]['Cars']
             st.markdown(f"""
                 <div style='font-size: 1.2rem; font-weight: normal;'>
                     Estimated Emissions for Your Car Travel: <span style='color:#4CAF50'>{car_emissions:.2f}</span> tCO₂e
@@ -405,23 +551,27 @@ with tabs[1]:
     with st.container():
         st.markdown("### 🏍️ Motorcycles")
 
-        user_data['motorcycle'] = []
+        update_household(motorcycle=[])
         
-        expander_style()
         with st.expander("**➕ Add motorcycle details**"):
             bike_cols = st.columns(3)
             with bike_cols[1]:
-                num_bikes = st.number_input("Number of Motorcycles", min_value=0, value=0, step=1, key='num_bikes', format="%d")
-            user_data['motorcycle'] = []
+                num_bikes = st.number_input("Number of Motorcycles", min_value=0, max_value=MAX_VEHICLES, value=0, step=1, key='num_bikes', format="%d")
+            motorcycles = []
             for i in range(num_bikes):
                 st.markdown(f"**Motorcycle {i+1}**", help="Enter annual distance and fuel efficiency")
+                use_routes = road_graph is not None and st.checkbox("Calculate distance from my frequent routes", key=f'bike_use_routes_{i}')
                 cols = st.columns(2)
                 with cols[0]:
-                    miles = st.number_input("Kilometers Driven Per Year", min_value=0, value=8000, key=f'bike_miles_{i}', format="%d")
+                    if not use_routes:
+                        miles = st.number_input("Kilometers Driven Per Year", min_value=0, value=8000, key=f'bike_miles_{i}', format="%d")
                 with cols[1]:
                     efficiency = st.number_input("Fuel Efficiency (km/l)", min_value=1.0, value=30.0, key=f'bike_eff_{i}')
-                user_data['motorcycle'].append({'miles_driven': miles, 'fuel_efficiency': efficiency})
-            bike_emissions = calculate_emissions(user_data)[0]['Motorcycle']
+                if use_routes:
+                    miles = routes_annual_km(f'bike_{i}')
+                motorcycles.append(Vehicle(miles, efficiency))
+            update_household(motorcycle=motorcycles)
+            bike_emissions = calculate_emissions(user_data, country.factors)[0]['Motorcycle']
             st.markdown(f"""
                 <div style='font-size: 1.2rem; font-weight: normal;'>
                     Estimated Emissions for Your Motorcycle Travel: <span style='color:#4CAF50'>{bike_emissions:.2f}</span> tCO₂e
@@ -432,15 +582,18 @@ with tabs[1]:
     with st.container():
         st.markdown("### 🚌 Public Bus Travel")
         
-        expander_style()
         with st.expander("**➕ Add bus travel details**"):
-            cols = st.columns(2)
-            with cols[0]:
-                user_data['bus'] = st.number_input("Kilometers Traveled by Bus Per Year", min_value=0, value=0, key='bus_km', format="%d")
-            with cols[1]:
-                st.markdown("")
+            use_routes = road_graph is not None and st.checkbox("Calculate distance from my frequent routes", key='bus_use_routes')
+            if use_routes:
+                update_household(bus=routes_annual_km('bus'))
+            else:
+                cols = st.columns(2)
+                with cols[0]:
+                    update_household(bus=st.number_input("Kilometers Traveled by Bus Per Year", min_value=0, value=0, key='bus_km', format="%d"))
+                with cols[1]:
+                    st.markdown("")
 
-            bus_emissions = calculate_emissions(user_data)[0]['Bus']
+            bus_emissions = calculate_emissions(user_data, country.factors)[0]['Bus']
             st.markdown(f"""
                 <div style='font-size: 1.2rem; font-weight: normal;'>
                     Estimated Emissions for Your Bus Travel: <span style='color:#4CAF50'>{bus_emissions:.2f}</span> tCO₂e
@@ -451,98 +604,8 @@ with tabs[1]:
     with st.container():
         st.markdown("### ✈️ Air Travel")
 
-        airports = {
-            # --- Pakistan Airports ---
-            "Islamabad (ISB)": (33.6167, 73.0991),
-            "Lahore (LHE)": (31.5216, 74.4036),
-            "Karachi (KHI)": (24.9065, 67.1608),
-            "Multan (MUX)": (30.2032, 71.4191),
-            "Peshawar (PEW)": (33.9939, 71.5146),
-            "Quetta (UET)": (30.2514, 66.9378),
-            "Sialkot (SKT)": (32.5356, 74.3639),
-            "Faisalabad (LYP)": (31.3654, 72.9948),
-            "Bahawalpur (BHV)": (29.3481, 71.7180),
-            "Rahim Yar Khan (RYK)": (28.3839, 70.2796),
-            "Gwadar (GWD)": (25.2322, 62.3295),
-            "Turbat (TUK)": (25.9864, 63.0302),
-            "Skardu (KDU)": (35.3354, 75.5361),
-            "Gilgit (GIL)": (35.9188, 74.3336),
-
-            # --- Gulf / Middle East ---
-            "Dubai (DXB)": (25.2532, 55.3657),
-            "Abu Dhabi (AUH)": (24.4329, 54.6511),
-            "Sharjah (SHJ)": (25.3286, 55.5171),
-            "Doha (DOH)": (25.2736, 51.6080),
-            "Muscat (MCT)": (23.5933, 58.2844),
-            "Jeddah (JED)": (21.6796, 39.1565),
-            "Riyadh (RUH)": (24.9576, 46.6988),
-            "Dammam (DMM)": (26.4711, 49.7979),
-            "Medina (MED)": (24.5539, 39.7051),
-            "Gassim (ELQ)": (26.3028, 43.7744),
-            "Bahrain (BAH)": (26.2708, 50.6336),
-            "Kuwait City (KWI)": (29.2266, 47.9689),
-            "Musandam (KHS)": (26.2081, 56.2625),
-            "Sana'a (SAH)": (15.4675, 44.2194),
-            "Aden (ADE)": (12.7844, 45.0161),
-            "Erbil (EBL)": (36.2333, 44.0083),
-            "Basra (BSR)": (30.5494, 47.6542),
-            "Sulaymaniyah (ISU)": (35.5600, 45.4400),
-            "Najaf (NJF)": (31.9894, 44.4042),
-            "Sulaymaniyah (ISU)": (35.5600, 45.4400),
-            "Kuwait City (KWI)": (29.2266, 47.9689),
-            "Muscat (MCT)": (23.5933, 58.2844),
-
-            # --- Central & South Asia ---
-            "Tashkent (TAS)": (41.2579, 69.2817),
-            "Baku (GYD)": (40.4675, 50.0467),
-            "Kuala Lumpur (KUL)": (2.7456, 101.7092),
-            "Beijing (PEK)": (40.0801, 116.5846),
-            "Baghdad (BGW)": (33.2625, 44.2346),
-            "Najaf (NJF)": (31.9894, 44.4042),
-            "Bishkek (FRU)": (43.0617, 74.4777),
-            "Almaty (ALA)": (43.3528, 77.0402),
-            "Dushanbe (DYU)": (38.5433, 68.7811),
-            "Kathmandu (KTM)": (27.6961, 85.3597),
-            "Colombo (CMB)": (7.1800, 79.8842),
-            "Dhaka (DAC)": (23.8431, 90.3978),
-            "Mumbai (BOM)": (19.0887, 72.8689),
-            "Delhi (DEL)": (28.5562, 77.1000),
-            "Chennai (MAA)": (12.9948, 80.1785),
-            "Bangkok (BKK)": (13.6811, 100.7476),
-            "Singapore (SIN)": (1.3502, 103.9940),
-            "Hong Kong (HKG)": (22.3080, 113.9185),
-            "Jakarta (CGK)": (-6.1256, 106.6552),
-            "Seoul (ICN)": (37.4692, 126.4500),
-            "Tokyo (NRT)": (35.7647, 140.3864),
-            "Shanghai (PVG)": (31.1436, 121.8052),
-            "Manila (MNL)": (14.5086, 121.0190),
-            "Hanoi (HAN)": (21.2210, 105.8042),
-            "Ho Chi Minh City (SGN)": (10.8181, 106.6511),
-            "Kabul (KBL)": (34.5650, 69.2120),
-
-            # --- Europe & North America ---
-            "London Heathrow (LHR)": (51.4700, -0.4543),
-            "London Gatwick (LGW)": (51.1537, -0.1821),
-            "Paris Charles de Gaulle (CDG)": (49.0097, 2.5479),
-            "Toronto Pearson (YYZ)": (43.6777, -79.6248),
-            "New York JFK (JFK)": (40.6413, -73.7781),
-            "Los Angeles (LAX)": (33.9425, -118.4081),
-            "San Francisco (SFO)": (37.6189, -122.3750),
-            "Chicago O'Hare (ORD)": (41.9742, -87.9073),
-            "Miami (MIA)": (25.7932, -80.2906),
-            "Dallas Fort Worth (DFW)": (32.8968, -97.0380),
-            "Atlanta (ATL)": (33.6407, -84.4279),
-            "Seattle (SEA)": (47.4502, -122.3088),
-            "Washington Dulles (IAD)": (38.9445, -77.4558),
-            "Boston Logan (BOS)": (42.3641, -71.0052),
-            "Vancouver (YVR)": (49.1939, -123.1830),
-            "Montreal (YUL)": (45.4706, -73.7400),
-            "Calgary (YYC)": (51.1139, -114.0200),
-            "Ottawa (YOW)": (45.3222, -75.6692),
-            "Mexico City (MEX)": (19.4361, -99.0721)
-        }
+        airports = AIRPORTS
 
-        expander_style()
         with st.expander("**➕ Add flight details**"):
             # Create three columns and center the radio button in the middle one
             _, col2, _ = st.columns([1.8, 2, 1])
@@ -554,6 +617,7 @@ with tabs[1]:
                     label="",
                     options=["Yes", "No"],
                     index=1,
+                    key="flights_taken",
                     horizontal=True,
                     label_visibility="collapsed"
                 )
@@ -563,6 +627,8 @@ with tabs[1]:
             else:
                 # Select number of legs in the trip
                 num_legs = st.number_input("How many destinations are in your trip?", min_value=1, max_value=20, value=1, step=1, key="num_legs")
+                custom_cities = st.checkbox("My city isn't in the list", key="custom_cities",
+                                            help="Type any city or airport name and we'll look it up")
 
                 round_trip_flags = []
                 legs = []
@@ -571,11 +637,17 @@ with tabs[1]:
                 for i in range(num_legs):
                     st.markdown(f"**Leg {i + 1}**")
                     col1, col2, col3 = st.columns([4, 4, 2])
-                    with col1:
-                        dep = st.selectbox(f"Departure City (Leg {i + 1})", options=sorted(list(airports.keys())), index=None, placeholder='Choose your departure city', key=f"dep_{i}")
-                    with col2:
-                        arrival_options = sorted([airport for airport in airports.keys() if airport != dep])
-                        arr = st.selectbox(f"Arrival City (Leg {i + 1})", options=arrival_options, index=None, placeholder="Choose your arrival city", key=f"arr_{i}")
+                    if custom_cities:
+                        with col1:
+                            dep = st.text_input(f"Departure City (Leg {i + 1})", placeholder="e.g. Rawalpindi", key=f"dep_name_{i}").strip() or None
+                        with col2:
+                            arr = st.text_input(f"Arrival City (Leg {i + 1})", placeholder="e.g. Manchester", key=f"arr_name_{i}").strip() or None
+                    else:
+                        with col1:
+                            dep = st.selectbox(f"Departure City (Leg {i + 1})", options=country.airports, index=None, placeholder='Choose your departure city', key=f"dep_{i}")
+                        with col2:
+                            arrival_options = [airport for airport in country.airports if airport != dep]
+                            arr = st.selectbox(f"Arrival City (Leg {i + 1})", options=arrival_options, index=None, placeholder="Choose your arrival city", key=f"arr_{i}")
                     with col3:
                         st.markdown("<div style='height: 40px;'></div>", unsafe_allow_html=True)
                         is_round = st.checkbox("Return?", key=f"return_{i}", value=True)
@@ -583,20 +655,29 @@ with tabs[1]:
                     legs.append((dep, arr))
                     round_trip_flags.append(is_round)
 
-                if arr == None or dep == None:
-                    flight_distance = 0
+                if custom_cities:
+                    # Look up every leg at once instead of one city after another
+                    geocoder, coordinate_cache = load_geocoder()
+                    leg_coords = asyncio.run(resolve_legs(legs, geocoder, coordinate_cache))
+                    unresolved = sorted({name for leg, coords in zip(legs, leg_coords)
+                                         for name, c in zip(leg, coords) if name and c is None})
+                    if unresolved:
+                        st.warning(f"Couldn't find: {', '.join(unresolved)}. Try a nearby larger city or the airport code.")
                 else:
-                    flight_distance = 0
-                    for (dep, arr), is_round in zip(legs, round_trip_flags):
-                        if dep != arr:
-                            dist_km = geodesic(airports[dep], airports[arr]).km
-                            if is_round:
-                                dist_km *= 2
-                            flight_distance += dist_km
+                    leg_coords = [(airports.get(dep), airports.get(arr)) for dep, arr in legs]
+
+                flight_distance = 0
+                for (dep_coords, arr_coords), is_round in zip(leg_coords, round_trip_flags):
+                    if dep_coords is None or arr_coords is None or dep_coords == arr_coords:
+                        continue
+                    dist_km = leg_distance_km(dep_coords, arr_coords)
+                    if is_round:
+                        dist_km *= 2
+                    flight_distance += dist_km
             
             # Store flight emissions in user_data
-            user_data['flight_distance'] = flight_distance
-            flight_emissions = calculate_emissions(user_data)[0]['Flights']
+            update_household(flight_distance=flight_distance)
+            flight_emissions = calculate_emissions(user_data, country.factors)[0]['Flights']
 
             st.markdown(f"""
                 <div style='font-size: 1.2rem; font-weight: normal;'>
@@ -613,8 +694,15 @@ with tabs[1]:
         unsafe_allow_html=True
     )
 
+    running_total()
+    sync_profile_link(fragment=True)
+
+with tabs[1]:
+    transport_tab()
+
 # --- Secondary Emissions Tab ---
-with tabs[2]:
+@st.fragment
+def secondary_tab():
     st.markdown(
         "<h2 style='font-size: 2rem; font-weight: 700; margin-bottom: 0.5rem;'>🛍️ Secondary Emissions</h2>"
         "<h4 style='color: gray; font-size: 1.15rem;'>Estimate your yearly CO₂ emissions from lifestyle choices.</h4>",
@@ -622,31 +710,12 @@ with tabs[2]:
     )
 
     # --- EPA Emission Factors ---
-    diet_emission_factors = {
-        "Meat-heavy (mutton/beef)": 3.3,
-        "Meat-heavy (chicken)": 1.9,
-        "Average (mixed)": 2.5,
-        "Vegetarian": 1.7,
-        "Vegan": 1.5
-    }
-
-    device_emission_factor = 0.35
-    emission_per_pkr = 0.00089
+    diet_emission_factors = country.diet_factors
 
     # --- Spending Ranges ---
-    spending_ranges = {
-        "0 PKR": 0,
-        "less than 5,000 PKR": 2500,
-        "5,000 - 10,000 PKR": 7500,
-        "10,000 - 20,000 PKR": 15000,
-        "20,000 - 50,000 PKR": 35000,
-        "50,000 - 100,000 PKR": 75000,
-        "100,000 - 200,000 PKR": 150000,
-        "greater than 200,000 PKR": 250000,
-    }
+    spending_ranges = country.spending_ranges
 
     # --- Food/Diet ---
-    expander_style()
     with st.expander("**🍽️ What kind of diet do you follow?**"):
         diet_options = list(diet_emission_factors.keys())
 
@@ -659,96 +728,56 @@ with tabs[2]:
         for i, (diet, _) in enumerate(diet_emission_factors.items()):
             is_selected = st.session_state["diet_type"] == diet
 
-            # Apply a different color if selected
-            bg_color = "#4CAF50" if is_selected else "#f0f0f0"
-            text_color = "white" if is_selected else "black"
-            border_color = "#4CAF50" if is_selected else "#ccc"
-
+            # The container key picks the selected/unselected colours from diet_button_style()
             with cols[i]:
-                with stylable_container(
-                    key=f"custom_button_{diet.replace(' ', '_')}",
-                    css_styles=f"""
-                        [data-testid="stButton"] button {{
-                            background-color: {bg_color};
-                            color: {text_color};
-                            border: 1px solid {border_color};
-                            border-radius: 6px;
-                            margin-bottom: 16px;
-                            transition: all 0.2s ease;
-                        }}
-                        [data-testid="stButton"] button:hover {{
-                            background-color: #45a049 !important;
-                            color: white !important;
-                            border-color: #45a049 !important;
-                        }}
-                        [data-testid="stButton"] button:active {{
-                            background-color: #3e8e41 !important;
-                            color: white !important;
-                            border-color: #3e8e41 !important;
-                            transform: scale(0.98);
-                        }}
-                        [data-testid="stButton"] button:focus {{
-                            outline: none !important;
-                            box-shadow: none !important;
-                        }}
-                        [data-testid="stButton"] button:focus,
-                        [data-testid="stButton"] button:focus-visible {{
-                            color: white !important;
-                            border-color: #3e8e41 !important;
-                            box-shadow: none !important;
-                        }}
-                    """,
-                ):
-                    if st.button(diet, use_container_width=True):
-                        st.session_state["diet_type"] = diet
-                        st.rerun()
-
-        # Store selection in user_data
-        user_data['food'] = diet_emission_factors[st.session_state['diet_type']] * 1000  # convert to kg
+                with st.container(key=f"diet_button_{i}_{'selected' if is_selected else 'plain'}"):
+                    st.button(diet, use_container_width=True, on_click=select_diet, args=(diet,))
 
     # --- Electronics ---
     electronic_emission = 0.0017
-    expander_style()
     with st.expander("**📱 How many new electronic devices did you purchase this year?**"):
         devices = st.slider("Number of new devices (phones, laptops, etc.):", 0, 10, 0, key="device_count")
-        user_data['electronics'] = devices * device_emission_factor * 1000  # convert to kg
 
     # --- Clothing ---
-    clothing_emission = 0.007
-    expander_style()
     with st.expander("**👕 Clothing Spending**"):
-        selectbox_style()
-        choice = st.selectbox("Select your yearly spending on clothing:", list(spending_ranges.keys()), index=0, key="clothing_range")
-        user_data['clothing'] = spending_ranges[choice] * clothing_emission
+        clothing_choice = st.selectbox("Select your yearly spending on clothing:", list(spending_ranges.keys()), index=0, key="clothing_range")
 
     # --- Furniture ---
     furniture_emission = 0.0014
-    expander_style()
     with st.expander("**🪑 Furniture Spending**"):
-        selectbox_style()
-        choice = st.selectbox("Select your yearly spending on furniture:", list(spending_ranges.keys()), index=0, key="furniture_range")
-        user_data['furniture'] = spending_ranges[choice] * emission_per_pkr
+        furniture_choice = st.selectbox("Select your yearly spending on furniture:", list(spending_ranges.keys()), index=0, key="furniture_range")
 
     # --- Recreation ---
     recreation_emission = 0.0009
-    expander_style()
     with st.expander("**🎮 Recreation Spending**"):
-        selectbox_style()
-        choice = st.selectbox("Select your yearly spending on recreation (travel, entertainment):", list(spending_ranges.keys()), index=0, key="recreation_range")
-        user_data['recreation'] = spending_ranges[choice] * emission_per_pkr
+        recreation_choice = st.selectbox("Select your yearly spending on recreation (travel, entertainment):", list(spending_ranges.keys()), index=0, key="recreation_range")
+
+    # Per-item kg go into user_data for the Total tab and reports; the tab's own total is a table lookup
+    update_household(**country.secondary_components(st.session_state['diet_type'], devices, clothing_choice,
+                                                    furniture_choice, recreation_choice))
 
     # --- Result ---
-    sec_emissions = calculate_emissions(user_data)[0]['Secondary']
+    sec_emissions = secondary_emissions(answer_indices(st.session_state, country.code), country.code)
     st.markdown(
         f"<h4 style='color: #444; text-align: center; margin-top: 2rem;'>"
         f"🛒 Your Secondary Carbon Footprint is <span style='color:#d43f3a'>{sec_emissions:.2f}</span> tCO₂e</h4>",
         unsafe_allow_html=True
     )
 
-total_emissions = round(calculate_emissions(user_data)[1], 2)
+    running_total()
+    sync_profile_link(fragment=True)
+
+with tabs[2]:
+    secondary_tab()
 
 # --- Results Tab ---
-with tabs[3]:
+def total_tab():
+    emissions, total_emissions = current_emissions()
+    total_emissions = round(total_emissions, 2)
+    household_emissions = emissions['Household']
+    vehicle_emissions = emissions['Cars'] + emissions['Motorcycle'] + emissions['Bus'] + emissions['Flights']
+    sec_emissions = emissions['Secondary']
+
     st.markdown("""
         <style>
             .main-title {
@@ -826,7 +855,7 @@ with tabs[3]:
 
                         .result-box::before {{
                             content: "";
-                            background-image: url("data:image/png;base64,{image_base64}");
+                            background-image: url("app/static/footprint.png");
                             background-repeat: no-repeat;
                             background-position: center;
                             background-size: 350px;
@@ -860,7 +889,7 @@ with tabs[3]:
             <div style='height: 17px;'></div>
             <div class='black-box'>
                 <div style='font-size: 16px;'>National Average Carbon Footprint</div>
-                <div style='font-size: 36px; font-weight: bold;'>2.1 tCO₂e</div>
+                <div style='font-size: 36px; font-weight: bold;'>{country.national_average} tCO₂e</div>
                 <div style='font-size: 16px;'>per capita</div>
             </div>
             <div style='height: 20px;'></div>
@@ -888,9 +917,9 @@ with tabs[3]:
             <div class='grey-box'>
                 <div style='font-size: 16px;'>Your Carbon Foorprint is more than</div>
                 <div style='font-size: 36px; font-weight: bold;'>
-                    {min(round(user_percentile(total_emissions), 1), 99)}
+                    {min(round(cached_percentile(total_emissions, country.code), 1), 99)}
                     <span style='font-size: 24px;'>%</span>
-                    <div style='font-size: 16px; font-weight: normal;'>of Pakistan's population</div>
+                    <div style='font-size: 16px; font-weight: normal;'>of {country.name}'s population</div>
                 </div>
             </div>
             """, unsafe_allow_html=True)
@@ -985,3 +1014,29 @@ with tabs[3]:
                 </div>
             """, unsafe_allow_html=True)
 
+    st.markdown("<div style='height: 30px;'></div>", unsafe_allow_html=True)
+    _, col_png, col_pdf, _ = st.columns([2, 1, 1, 2])
+    # Reports are only rendered when a button is clicked, off the script thread, from a
+    # copy of the answers as shown here rather than the record later edits will change
+    snapshot = Household.from_dict(user_data.to_dict())
+    with col_png:
+        st.download_button("⬇️ Download PNG report", data=partial(render_household, snapshot, "png", country.code),
+                           file_name="carbon-footprint.png", mime="image/png", use_container_width=True)
+    with col_pdf:
+        st.download_button("⬇️ Download PDF report", data=partial(render_household, snapshot, "pdf", country.code),
+                           file_name="carbon-footprint.pdf", mime="application/pdf", use_container_width=True)
+
+    if ANALYTICS_ENABLED:
+        _, col_share, _ = st.columns([1, 2, 1])
+        with col_share:
+            share = st.checkbox("Share my anonymous results to help improve the calculator", value=False, key="share_analytics",
+                                help="Only your answers and totals are stored, with no name, location or airports.")
+        if share:
+            log_result(emissions, total_emissions)
+
+# The summary is only built while its tab is showing
+if tabs[3].open:
+    with tabs[3]:
+        total_tab()
+
+sync_profile_link()
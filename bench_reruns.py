@@ -0,0 +1,159 @@
+"""Per-interaction server time: full script rerun vs. fragment rerun.
+
+    python bench_reruns.py --rounds 20
+
+Starts `streamlit run app.py` and drives it over the same websocket protocol
+the browser uses. Each round changes one widget per tab twice: once as a
+full script rerun, which is what every interaction cost before the tabs
+became fragments, and once as the browser sends it now, a rerun of only the
+fragment that owns the widget. Both are timed from sending the change to the
+server's script_finished message.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+from startup_time import APP_PATH, _free_port, _wait_for_health
+
+# One widget change per tab: widget key -> value for round i
+INTERACTIONS = {
+    "household_tab": ("people_count", lambda i: 1 + i % 6),
+    "transport_tab": ("bus_km", lambda i: 1000 * (i + 1)),
+    "secondary_tab": ("device_count", lambda i: [i % 11]),
+}
+
+# Widgets set before timing, so the tabs render a realistic amount
+SETUP = (("num_cars", 3), ("flights_taken", "Yes"), ("num_legs", 10))
+
+
+def _widget_state(widget_id, value):
+    state = WidgetState(id=widget_id)
+    if value is True:
+        state.trigger_value = True  # button click
+    elif isinstance(value, str):
+        state.string_value = value  # radio and selectbox send the option label
+    elif isinstance(value, list):
+        state.double_array_value.data[:] = value  # slider
+    else:
+        state.double_value = value  # number_input
+    return state
+
+
+class Session:
+    """One browser tab's websocket session."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}  # widget key -> (widget id, fragment id)
+        self.buttons = {}  # label -> (widget id, fragment id), for buttons without a key
+        self.states = {}  # widget id -> WidgetState, resent on every rerun like the browser does
+
+    def set(self, key, value):
+        widget_id, fragment_id = self.widgets[key]
+        self.states[widget_id] = _widget_state(widget_id, value)
+        return fragment_id
+
+    def click(self, label):
+        widget_id, fragment_id = self.buttons[label]
+        self.states[widget_id] = _widget_state(widget_id, True)
+        return fragment_id
+
+    def _register(self, widget_id, fragment_id, label):
+        # $$ID-<hash>-<key>, with "None" as the key of a widget created without one
+        key = widget_id.split("-", 2)[2]
+        if key == "None":
+            self.buttons[label] = (widget_id, fragment_id)
+        else:
+            self.widgets[key] = (widget_id, fragment_id)
+
+    def rerun(self, fragment_id="", timeout=120):
+        request = BackMsg()
+        request.rerun_script.query_string = ""
+        request.rerun_script.page_script_hash = ""
+        request.rerun_script.widget_states.widgets.extend(self.states.values())
+        request.rerun_script.fragment_id = fragment_id
+        start = time.perf_counter()
+        self.ws.send(request.SerializeToString())
+        # A click is sent with one rerun only, like the browser does
+        for widget_id in [widget_id for widget_id, state in self.states.items()
+                          if state.WhichOneof("value") == "trigger_value"]:
+            del self.states[widget_id]
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(self.ws.recv(timeout=timeout))
+            kind = msg.WhichOneof("type")
+            if kind == "script_finished":
+                return time.perf_counter() - start
+            if kind != "delta":
+                continue
+            delta_type = msg.delta.WhichOneof("type")
+            if delta_type == "new_element":
+                element = msg.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "exception":
+                    raise RuntimeError(f"app raised {element.exception.type}: {element.exception.message}")
+                proto = getattr(element, element_type)
+                widget_id = getattr(proto, "id", "")
+                if widget_id.startswith("$$ID-"):
+                    self._register(widget_id, msg.delta.fragment_id, getattr(proto, "label", ""))
+            elif delta_type == "add_block" and msg.delta.add_block.id.startswith("$$ID-"):
+                # Widgets that are blocks, like the keyed st.tabs
+                self._register(msg.delta.add_block.id, msg.delta.fragment_id, "")
+
+
+def measure(rounds, timeout=120):
+    """{tab: ([full rerun seconds], [fragment rerun seconds])}"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless=true",
+         f"--server.port={port}", "--browser.gatherUsageStats=false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for_health(port, process, timeout)
+        with connect(f"ws://localhost:{port}/_stcore/stream", open_timeout=timeout) as ws:
+            session = Session(ws)
+            session.rerun(timeout=timeout)
+            for key, value in SETUP:
+                session.set(key, value)
+                session.rerun(timeout=timeout)
+
+            samples = {name: ([], []) for name in INTERACTIONS}
+            # Round -1 warms caches and isn't recorded
+            for i in range(-1, rounds):
+                for name, (key, value) in INTERACTIONS.items():
+                    session.set(key, value(2 * i + 2))
+                    full = session.rerun(timeout=timeout)
+                    fragment_id = session.set(key, value(2 * i + 3))
+                    fragment = session.rerun(fragment_id, timeout=timeout)
+                    if i >= 0:
+                        samples[name][0].append(full)
+                        samples[name][1].append(fragment)
+            return samples
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    samples = measure(args.rounds)
+    print(f"median over {args.rounds} rounds")
+    print(f"{'interaction':<16}{'full rerun':>14}{'fragment rerun':>18}{'saved':>10}")
+    for name, (full, fragment) in samples.items():
+        before, after = statistics.median(full), statistics.median(fragment)
+        print(f"{name:<16}{before * 1000:>11.1f} ms{after * 1000:>15.1f} ms{1 - after / before:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Precompute the data files the app would otherwise build on first use.
+
+    python build_artifacts.py
+
+Run at image build time (see Dockerfile). Each file is optional: without it
+the app computes the same numbers at runtime, just more slowly.
+"""
+import time
+
+import secondary_table
+from airports import DISTANCES_PATH, build_distance_matrix, save_distance_matrix
+from countries import PERCENTILE_TABLE_PATH, available_countries, save_percentile_table
+from routing import ROAD_EXTRACT_PATH, ROAD_GRAPH_PATH, RoadGraph
+
+
+def _timed(name, build, path):
+    start = time.perf_counter()
+    build()
+    print(f"{name} -> {path} ({time.perf_counter() - start:.2f}s)")
+
+
+def main():
+    _timed("airport distance matrix", lambda: save_distance_matrix(build_distance_matrix()), DISTANCES_PATH)
+    for code in available_countries():
+        _timed(f"{code} percentile table", lambda: save_percentile_table(code), PERCENTILE_TABLE_PATH.format(code=code))
+        _timed(f"{code} secondary lookup table", lambda: secondary_table.build(code), secondary_table.TABLE_PATH.format(code=code))
+    if ROAD_EXTRACT_PATH:
+        _timed("road graph", lambda: RoadGraph.from_osm(ROAD_EXTRACT_PATH).save(ROAD_GRAPH_PATH), ROAD_GRAPH_PATH)
+    else:
+        print("road graph skipped: set ROAD_EXTRACT to an OSM roads extract (see routing.py) "
+              "to enable route-based distances")
+
+
+if __name__ == "__main__":
+    main()
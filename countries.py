@@ -0,0 +1,139 @@
+"""Per-country calculator settings, one JSON profile per country in data/countries.
+
+A profile bundles the emission factors, the currency and its spending
+buckets, the national average, the population mixture behind the percentile,
+and the airports offered in the flight dropdowns (null means all of them).
+
+Profiles and the arrays derived from them are loaded on first use and kept in
+LRU caches of COUNTRY_CACHE_SIZE countries, so a process serving many
+countries only holds the ones in use, and switching back to a recent one
+costs nothing.
+"""
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from airports import AIRPORTS
+from emissions import reference_distribution, secondary_components
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COUNTRIES_DIR = os.environ.get("COUNTRIES_DIR", os.path.join(BASE_DIR, "data", "countries"))
+# Built by build_artifacts.py; a missing or stale file is regenerated in memory
+PERCENTILE_TABLE_PATH = os.environ.get("PERCENTILE_TABLE", os.path.join(BASE_DIR, "data", "percentile_table_{code}.npz"))
+
+DEFAULT_COUNTRY = "PK"
+CACHE_SIZE = int(os.environ.get("COUNTRY_CACHE_SIZE", 8))
+
+
+@dataclass(frozen=True)
+class Country:
+    code: str
+    name: str
+    flag: str
+    currency: str
+    national_average: float  # tCO₂e per capita
+    factors: dict
+    diet_factors: dict  # tCO₂e per person per year
+    device_emission_factor: float  # tCO₂e per new device
+    clothing_emission: float  # kg CO₂e per unit of currency
+    emission_per_currency: float  # kg CO₂e per unit of currency on furniture and recreation
+    spending_ranges: dict  # label -> representative amount
+    reference_mixture: tuple
+    reference_seed: int
+    airports: tuple  # dropdown order
+
+    @classmethod
+    def from_dict(cls, data):
+        airports = data.get("airports")
+        if airports is None:
+            airports = sorted(AIRPORTS)
+        unknown = [name for name in airports if name not in AIRPORTS]
+        if unknown:
+            raise ValueError(f"{data['code']} profile lists unknown airports: {', '.join(unknown)}")
+        reference = data["reference"]
+        return cls(
+            code=data["code"],
+            name=data["name"],
+            flag=data["flag"],
+            currency=data["currency"],
+            national_average=data["national_average"],
+            factors=dict(data["factors"]),
+            diet_factors=dict(data["diet_factors"]),
+            device_emission_factor=data["device_emission_factor"],
+            clothing_emission=data["clothing_emission"],
+            emission_per_currency=data["emission_per_currency"],
+            spending_ranges=dict(data["spending_ranges"]),
+            reference_mixture=tuple(tuple(group) for group in reference["mixture"]),
+            reference_seed=reference["seed"],
+            airports=tuple(airports),
+        )
+
+    @property
+    def buckets(self):
+        return list(self.spending_ranges)
+
+    @property
+    def diets(self):
+        return list(self.diet_factors)
+
+    def secondary_components(self, diet, devices, clothing, furniture, recreation):
+        """kg CO₂e per Secondary item for a diet label, a device count and three bucket labels."""
+        spend = self.spending_ranges
+        return secondary_components(self.diet_factors[diet], devices, spend[clothing], spend[furniture], spend[recreation],
+                                    clothing_emission=self.clothing_emission,
+                                    emission_per_currency=self.emission_per_currency,
+                                    device_emission_factor=self.device_emission_factor)
+
+
+def _profile_path(code):
+    return os.path.join(COUNTRIES_DIR, f"{code.lower()}.json")
+
+
+@lru_cache(maxsize=1)
+def available_countries():
+    """{code: "flag name"} for every profile, for the country selector."""
+    labels = {}
+    for filename in sorted(os.listdir(COUNTRIES_DIR)):
+        if filename.endswith(".json"):
+            with open(os.path.join(COUNTRIES_DIR, filename), encoding="utf-8") as f:
+                profile = json.load(f)
+            labels[profile["code"]] = f"{profile['flag']} {profile['name']}"
+    return labels
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def load_country(code=DEFAULT_COUNTRY):
+    # Codes come from share tokens and batch files, so only ever open a listed profile
+    if not isinstance(code, str) or code.upper() not in available_countries():
+        raise ValueError(f"No country profile for {code!r}")
+    with open(_profile_path(code), encoding="utf-8") as f:
+        country = Country.from_dict(json.load(f))
+    # Share tokens and the analytics log store a diet by its position, and the
+    # chosen diet carries over when the country changes
+    if country.code != DEFAULT_COUNTRY and country.diets != load_country(DEFAULT_COUNTRY).diets:
+        raise ValueError(f"{country.code} profile must list the same diets as {DEFAULT_COUNTRY}")
+    return country
+
+
+def save_percentile_table(code, path=None):
+    country = load_country(code)
+    reference = reference_distribution(country.reference_mixture, country.reference_seed)
+    np.savez(path or PERCENTILE_TABLE_PATH.format(code=code), reference=reference,
+             mixture=np.array(country.reference_mixture, dtype=np.float64), seed=country.reference_seed)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def percentile_reference(code=DEFAULT_COUNTRY):
+    """The country's sorted reference distribution, for emissions.user_percentile."""
+    country = load_country(code)
+    path = PERCENTILE_TABLE_PATH.format(code=code)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            # A table built from an older mixture would shift every percentile
+            if (np.array_equal(data["mixture"], np.array(country.reference_mixture, dtype=np.float64))
+                    and int(data["seed"]) == country.reference_seed):
+                return data["reference"]
+    return reference_distribution(country.reference_mixture, country.reference_seed)
@@ -0,0 +1,173 @@
+from functools import lru_cache
+
+import numpy as np
+
+from household import Household
+
+# Pakistan's numbers, the defaults everywhere; other countries' live in
+# data/countries (see countries.py); tests/test_countries.py keeps pk.json equal to these
+FACTORS = {
+    'electricity': 0.5004, # kg CO2e per kWh
+    'gas': 2.2, # kg CO2e per m³
+    'fuel': 2.7, # kg CO2e per litre of petrol
+    'bus': 0.1234, # kg CO2e per km per passenger
+    'flights': 0.115, # kg CO2e per km per passenger
+}
+
+# --- Secondary (lifestyle) factors ---
+DIET_EMISSION_FACTORS = {
+    "Meat-heavy (mutton/beef)": 3.3, # tCO2e per person per year
+    "Meat-heavy (chicken)": 1.9,
+    "Average (mixed)": 2.5,
+    "Vegetarian": 1.7,
+    "Vegan": 1.5
+}
+
+DEVICE_EMISSION_FACTOR = 0.35 # tCO2e per new device
+CLOTHING_EMISSION = 0.007 # kg CO2e per PKR
+EMISSION_PER_PKR = 0.00089 # kg CO2e per PKR on furniture and recreation
+
+# Yearly spending buckets (label -> representative PKR amount)
+SPENDING_RANGES = {
+    "0 PKR": 0,
+    "less than 5,000 PKR": 2500,
+    "5,000 - 10,000 PKR": 7500,
+    "10,000 - 20,000 PKR": 15000,
+    "20,000 - 50,000 PKR": 35000,
+    "50,000 - 100,000 PKR": 75000,
+    "100,000 - 200,000 PKR": 150000,
+    "greater than 200,000 PKR": 250000,
+}
+
+SECONDARY_KEYS = ['food', 'clothing', 'electronics', 'furniture', 'recreation']
+
+CATEGORIES = ['Household', 'Cars', 'Motorcycle', 'Bus', 'Flights', 'Secondary']
+
+# (mean, standard deviation, sample size) of each income group's per-capita tCO₂e
+REFERENCE_MIXTURE = (
+    (0.9, 1.8, 5000),  # low income, 50%
+    (2.1, 1, 4000),    # middle income, 40%
+    (9, 3, 1000),      # high income, 10%
+)
+
+
+def secondary_components(diet_factor, devices, clothing_spend, furniture_spend, recreation_spend,
+                         clothing_emission=CLOTHING_EMISSION, emission_per_currency=EMISSION_PER_PKR,
+                         device_emission_factor=DEVICE_EMISSION_FACTOR):
+    """kg CO₂e per SECONDARY_KEYS entry for the Secondary tab's answers.
+
+    Spending is in the currency the per-currency factors are for (PKR by
+    default). Works element-wise on numpy arrays too, which is how
+    secondary_table builds its grid with exactly the arithmetic the app uses.
+    """
+    return {
+        'food': diet_factor * 1000,  # convert to kg
+        'clothing': clothing_spend * clothing_emission,
+        'electronics': devices * device_emission_factor * 1000,
+        'furniture': furniture_spend * emission_per_currency,
+        'recreation': recreation_spend * emission_per_currency,
+    }
+
+
+def calculate_emissions(data, factors=FACTORS):
+    if isinstance(data, Household):
+        return _household_emissions(data, factors)
+
+    electricity = data.get('electricity', 0)
+    gas = data.get('gas', 0)
+    people = max(data.get('people_count', 1), 1)  # Avoid division by 0
+
+    try:
+        electricity = float(electricity)
+    except (ValueError, TypeError):
+        electricity = 0
+
+    try:
+        gas = float(gas)
+    except (ValueError, TypeError):
+        gas = 0
+
+    # Household emissions per capita
+    total_household_emissions = (electricity * factors['electricity']) + (gas * factors['gas'])
+    household_emissions = total_household_emissions / people
+
+    emissions = {
+        'Household': household_emissions / 1000,
+        'Cars': sum((c['miles_driven'] / c['fuel_efficiency']) * factors['fuel'] for c in data.get('cars', [])) / 1000,
+        'Motorcycle': sum((b['miles_driven'] / b['fuel_efficiency']) * factors['fuel'] for b in data.get('motorcycle', [])) / 1000,
+        'Bus': data.get('bus', 0) * factors['bus'] / 1000,
+        'Flights': data.get('flight_distance', 0) * factors['flights']/1000,
+        'Secondary': sum(data.get(k, 0) for k in SECONDARY_KEYS) / 1000
+    }
+
+    total = sum(emissions.values())  # to metric tonnes
+    return emissions, total
+
+
+def _household_emissions(household, factors):
+    # Same arithmetic as the dict path, minus the coercion: a Household is already validated
+    total_household_emissions = (household.electricity * factors['electricity']) + (household.gas * factors['gas'])
+
+    emissions = {
+        'Household': total_household_emissions / household.people_count / 1000,
+        'Cars': sum((c.distance_km / c.fuel_efficiency) * factors['fuel'] for c in household.cars) / 1000,
+        'Motorcycle': sum((b.distance_km / b.fuel_efficiency) * factors['fuel'] for b in household.motorcycle) / 1000,
+        'Bus': household.bus * factors['bus'] / 1000,
+        'Flights': household.flight_distance * factors['flights'] / 1000,
+        'Secondary': sum(getattr(household, k) for k in SECONDARY_KEYS) / 1000
+    }
+
+    total = sum(emissions.values())
+    return emissions, total
+
+
+def calculate_emissions_batch(records, secondary=None, factors=FACTORS):
+    """Vectorized calculate_emissions over a HOUSEHOLD_DTYPE array.
+
+    secondary optionally supplies the Secondary tCO₂e per record, e.g. from
+    secondary_table.secondary_emissions() when scoring raw tab answers.
+    Returns ({category: array of tCO₂e}, array of totals).
+    """
+    records = np.atleast_1d(records)
+    slots = np.arange(records['car_km'].shape[-1])
+
+    def fleet(prefix, count):
+        used = slots < records[count][:, None]
+        litres = np.where(used, records[f'{prefix}_km'] / records[f'{prefix}_efficiency'], 0.0)
+        return litres.sum(axis=1) * factors['fuel'] / 1000
+
+    household = (records['electricity'] * factors['electricity'] + records['gas'] * factors['gas'])
+    emissions = {
+        'Household': household / np.maximum(records['people_count'], 1) / 1000,
+        'Cars': fleet('car', 'n_cars'),
+        'Motorcycle': fleet('motorcycle', 'n_motorcycles'),
+        'Bus': records['bus'] * factors['bus'] / 1000,
+        'Flights': records['flight_distance'] * factors['flights'] / 1000,
+        'Secondary': sum(records[k] for k in SECONDARY_KEYS) / 1000 if secondary is None else np.asarray(secondary, dtype=np.float64),
+    }
+
+    total = sum(emissions[c] for c in CATEGORIES)
+    return emissions, total
+
+
+def reference_distribution(mixture=REFERENCE_MIXTURE, seed=42):
+    """Sorted simulated per-capita footprints of a population, for user_percentile."""
+    # Simulate realistic income-based emissions distribution
+    rng = np.random.RandomState(seed)
+    emissions = np.concatenate([rng.normal(loc=loc, scale=scale, size=size) for loc, scale, size in mixture])
+    return np.sort(emissions[emissions > 0])
+
+
+@lru_cache(maxsize=1)
+def _default_reference():
+    return reference_distribution()
+
+
+def user_percentile(total_emissions, reference=None):
+    reference = _default_reference() if reference is None else reference
+    # scipy.stats.percentileofscore(kind='rank') on sorted data, without importing scipy
+    left = np.searchsorted(reference, total_emissions, side='left')
+    right = np.searchsorted(reference, total_emissions, side='right')
+    user_percentile = (left + right + (right > left)) * (50.0 / len(reference))
+
+    return max(user_percentile, 1)
@@ -0,0 +1,244 @@
+import asyncio
+import csv
+import difflib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Protocol, Sequence, Tuple
+
+Coordinates = Tuple[float, float]
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_PATH = os.path.join(BASE_DIR, "data", "gazetteer.csv")
+CACHE_PATH = os.environ.get("GEOCODE_CACHE", os.path.join(BASE_DIR, ".cache", "geocode.json"))
+
+
+# Other ways a query may name a gazetteer country, plus Pakistan's provinces
+COUNTRY_ALIASES = {
+    "uk": "United Kingdom", "england": "United Kingdom", "britain": "United Kingdom", "great britain": "United Kingdom",
+    "us": "United States", "usa": "United States", "america": "United States",
+    "united states of america": "United States",
+    "uae": "United Arab Emirates", "emirates": "United Arab Emirates",
+    "ksa": "Saudi Arabia", "turkiye": "Turkey", "korea": "South Korea", "holland": "Netherlands",
+    "punjab": "Pakistan", "sindh": "Pakistan", "khyber pakhtunkhwa": "Pakistan", "kpk": "Pakistan",
+    "balochistan": "Pakistan", "gilgit-baltistan": "Pakistan", "gilgit baltistan": "Pakistan",
+    "azad kashmir": "Pakistan", "ajk": "Pakistan",
+}
+
+# Words that don't change which place a query means
+FILLER_WORDS = {"airport", "international", "intl", "city", "the"}
+
+
+def normalize(query):
+    # "  Lahore (LHE) " and "lahore" should hit the same cache entry
+    return " ".join(str(query).replace("(", " ").replace(")", " ").split()).casefold()
+
+
+class Geocoder(Protocol):
+    def geocode(self, query: str) -> Optional[Coordinates]: ...
+
+
+class OfflineGeocoder:
+    """Resolves names against the bundled gazetteer, no network involved.
+
+    A trailing country or province ("Hyderabad, India", "Lahore Punjab")
+    restricts the match to that country. Anything else the query says that
+    isn't a known place returns None rather than a guess, so "London Ontario"
+    doesn't quietly become London, UK.
+    """
+
+    def __init__(self, path=GAZETTEER_PATH, fuzzy_cutoff=0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.places = {}
+        self.place_country = {}
+        self.countries = {normalize(alias): country for alias, country in COUNTRY_ALIASES.items()}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                coords = (float(row["lat"]), float(row["lon"]))
+                names = [row["name"]] + [a for a in (row.get("aliases") or "").split("|") if a]
+                for name in names:
+                    key = normalize(name)
+                    if key not in self.places:
+                        self.places[key] = coords
+                        self.place_country[key] = row["country"]
+                self.countries.setdefault(normalize(row["country"]), row["country"])
+
+    def _split_country(self, words):
+        """(place words, country) with a trailing country or province name removed."""
+        for size in (3, 2, 1):
+            if len(words) > size and " ".join(words[-size:]) in self.countries:
+                return words[:-size], self.countries[" ".join(words[-size:])]
+        return words, None
+
+    def _lookup(self, key, country):
+        if key in self.places and country in (None, self.place_country[key]):
+            return self.places[key]
+        return None
+
+    def geocode(self, query):
+        key = normalize(query)
+        if key in self.places:
+            return self.places[key]
+
+        parts = [part.split() for part in key.split(",") if part.strip()]
+        if not parts:
+            return None
+        if len(parts) > 1:
+            # "Place, Region, Country": every qualifier must be a country or province
+            qualifiers = [self.countries.get(" ".join(part)) for part in parts[1:]]
+            if None in qualifiers or len(set(qualifiers)) > 1:
+                return None
+            words, country = parts[0], qualifiers[0]
+        else:
+            words, country = self._split_country(parts[0])
+
+        words = [word for word in words if word not in FILLER_WORDS]
+        place = " ".join(words)
+        if place in self.places:
+            return self._lookup(place, country)
+
+        # "Karachi Airport" -> Karachi, but only if every remaining word names the same place
+        if words and all(word in self.places for word in words):
+            matches = {self.places[word] for word in words}
+            if len(matches) == 1:
+                return self._lookup(words[0], country)
+            return None
+
+        candidates = [name for name in self.places if country in (None, self.place_country[name])]
+        match = difflib.get_close_matches(place, candidates, n=1, cutoff=self.fuzzy_cutoff)
+        return self.places[match[0]] if match else None
+
+
+class GeopyGeocoder:
+    """Online lookups through geopy. Pass `geolocator` to swap in a stand-in."""
+
+    def __init__(self, geolocator=None, user_agent="pk-carbon-footprint", timeout=5):
+        if geolocator is None:
+            from geopy.geocoders import Nominatim
+            geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+        self.geolocator = geolocator
+
+    def geocode(self, query):
+        location = self.geolocator.geocode(query)
+        if location is None:
+            return None
+        return (float(location.latitude), float(location.longitude))
+
+
+class CoordinateCache:
+    """LRU cache of resolved coordinates, persisted to a JSON file between sessions."""
+
+    def __init__(self, path=CACHE_PATH, maxsize=2048):
+        self.path = path
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Held for a whole save, so saves land on disk in the order they snapshot
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for key, coords in json.load(f):
+                        self._entries[key] = tuple(coords)
+            except (ValueError, TypeError, OSError):
+                self._entries.clear()
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, query):
+        return normalize(query) in self._entries
+
+    def get(self, query):
+        key = normalize(query)
+        with self._lock:
+            coords = self._entries.get(key)
+            if coords is not None:
+                self._entries.move_to_end(key)
+            return coords
+
+    def put(self, query, coords):
+        key = normalize(query)
+        with self._lock:
+            self._entries[key] = tuple(coords)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                payload = [[key, list(coords)] for key, coords in self._entries.items()]
+                self._dirty = False
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            f = tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False, encoding="utf-8")
+            try:
+                with f:
+                    json.dump(payload, f)
+                os.replace(f.name, self.path)
+            except Exception:
+                os.remove(f.name)
+                with self._lock:
+                    self._dirty = True  # the next save retries
+                raise
+
+
+async def resolve_many(queries: Iterable[str], geocoder: Geocoder, cache: Optional[CoordinateCache] = None,
+                       max_concurrency=8):
+    """Resolve every distinct query concurrently; returns {query: coords or None}."""
+    queries = [q for q in queries if q]
+    results = {}
+    pending = {}
+    for query in queries:
+        coords = cache.get(query) if cache is not None else None
+        if coords is not None:
+            results[query] = coords
+        else:
+            pending.setdefault(normalize(query), []).append(query)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def lookup(key, originals):
+        async with semaphore:
+            try:
+                coords = await asyncio.to_thread(geocoder.geocode, originals[0])
+            except Exception:
+                # Network/backend failures behave like an unknown place
+                coords = None
+        if coords is not None and cache is not None:
+            cache.put(originals[0], coords)
+        for query in originals:
+            results[query] = coords
+
+    await asyncio.gather(*(lookup(key, originals) for key, originals in pending.items()))
+    if cache is not None:
+        cache.save()
+    return results
+
+
+async def resolve_legs(legs: Sequence[Tuple[str, str]], geocoder: Geocoder,
+                       cache: Optional[CoordinateCache] = None, max_concurrency=8):
+    """Resolve (departure, arrival) name pairs, all legs in parallel."""
+    names = [name for leg in legs for name in leg if name]
+    resolved = await resolve_many(names, geocoder, cache, max_concurrency)
+    return [(resolved.get(dep), resolved.get(arr)) for dep, arr in legs]
+
+
+def get_geocoder(backend=None):
+    backend = backend or os.environ.get("GEOCODER", "offline")
+    if backend == "geopy":
+        return GeopyGeocoder()
+    if backend == "offline":
+        return OfflineGeocoder()
+    raise ValueError(f"Unknown geocoder backend: {backend}")
@@ -0,0 +1,169 @@
+import math
+import struct
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+
+# Widest vehicle fleet a record can hold; the app caps its inputs to match
+MAX_VEHICLES = 10
+# people_count is packed as an unsigned short in to_bytes and HOUSEHOLD_DTYPE
+MAX_PEOPLE = 2 ** 16 - 1
+
+# Per-capita and per-vehicle inputs in the same units calculate_emissions expects:
+# kWh, m³, km, km/l and kg CO₂e for the secondary categories
+SCALAR_FIELDS = ('electricity', 'gas', 'bus', 'flight_distance',
+                 'food', 'clothing', 'electronics', 'furniture', 'recreation')
+
+HOUSEHOLD_DTYPE = np.dtype([
+    ('people_count', '<u2'),
+    *[(name, '<f8') for name in SCALAR_FIELDS],
+    ('n_cars', 'u1'),
+    ('car_km', '<f8', (MAX_VEHICLES,)),
+    ('car_efficiency', '<f8', (MAX_VEHICLES,)),
+    ('n_motorcycles', 'u1'),
+    ('motorcycle_km', '<f8', (MAX_VEHICLES,)),
+    ('motorcycle_efficiency', '<f8', (MAX_VEHICLES,)),
+])
+
+_HEADER = struct.Struct(f'<BH{len(SCALAR_FIELDS)}dBB')
+_VEHICLE = struct.Struct('<dd')
+_VERSION = 1
+
+
+def _check_amount(name, value):
+    value = float(value)
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"{name} must be a non-negative number, got {value!r}")
+    return value
+
+
+@dataclass(slots=True, frozen=True)
+class Vehicle:
+    distance_km: float
+    fuel_efficiency: float
+
+    def __post_init__(self):
+        object.__setattr__(self, 'distance_km', _check_amount('distance_km', self.distance_km))
+        efficiency = _check_amount('fuel_efficiency', self.fuel_efficiency)
+        if efficiency == 0:
+            raise ValueError("fuel_efficiency must be greater than 0")
+        object.__setattr__(self, 'fuel_efficiency', efficiency)
+
+
+@dataclass(slots=True)
+class Household:
+    """Validated inputs for one household.
+
+    The app fills this in field by field from bounded widgets; anything
+    coming from outside (batch files, decoded links) goes through from_dict,
+    which validates once so the emissions code never has to coerce.
+    """
+    people_count: int = 1
+    electricity: float = 0.0
+    gas: float = 0.0
+    cars: List[Vehicle] = field(default_factory=list)
+    motorcycle: List[Vehicle] = field(default_factory=list)
+    bus: float = 0.0
+    flight_distance: float = 0.0
+    food: float = 0.0
+    clothing: float = 0.0
+    electronics: float = 0.0
+    furniture: float = 0.0
+    recreation: float = 0.0
+
+    def __post_init__(self):
+        self.validate()
+
+    def validate(self):
+        if int(self.people_count) != self.people_count or not 1 <= self.people_count <= MAX_PEOPLE:
+            raise ValueError(f"people_count must be a whole number from 1 to {MAX_PEOPLE}, got {self.people_count!r}")
+        self.people_count = int(self.people_count)
+        for name in SCALAR_FIELDS:
+            setattr(self, name, _check_amount(name, getattr(self, name)))
+        for name in ('cars', 'motorcycle'):
+            vehicles = getattr(self, name)
+            if len(vehicles) > MAX_VEHICLES:
+                raise ValueError(f"at most {MAX_VEHICLES} {name} are supported, got {len(vehicles)}")
+            if not all(isinstance(v, Vehicle) for v in vehicles):
+                raise TypeError(f"{name} must be a list of Vehicle")
+        return self
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from the legacy `user_data` dict layout."""
+        def vehicles(key):
+            return [Vehicle(v['miles_driven'], v['fuel_efficiency']) for v in data.get(key, [])]
+
+        return cls(
+            people_count=data.get('people_count', 1),
+            cars=vehicles('cars'),
+            motorcycle=vehicles('motorcycle'),
+            **{name: data.get(name, 0) for name in SCALAR_FIELDS},
+        )
+
+    def to_dict(self):
+        data = {'people_count': self.people_count}
+        data.update({name: getattr(self, name) for name in SCALAR_FIELDS})
+        data['cars'] = [{'miles_driven': v.distance_km, 'fuel_efficiency': v.fuel_efficiency} for v in self.cars]
+        data['motorcycle'] = [{'miles_driven': v.distance_km, 'fuel_efficiency': v.fuel_efficiency} for v in self.motorcycle]
+        return data
+
+    def to_bytes(self):
+        header = _HEADER.pack(_VERSION, self.people_count,
+                              *(getattr(self, name) for name in SCALAR_FIELDS),
+                              len(self.cars), len(self.motorcycle))
+        vehicles = b''.join(_VEHICLE.pack(v.distance_km, v.fuel_efficiency) for v in self.cars + self.motorcycle)
+        return header + vehicles
+
+    @classmethod
+    def from_bytes(cls, payload):
+        version, people_count, *values = _HEADER.unpack_from(payload)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported household record version {version}")
+        n_cars, n_motorcycles = values[-2:]
+        expected = _HEADER.size + (n_cars + n_motorcycles) * _VEHICLE.size
+        if len(payload) != expected:
+            raise ValueError(f"Household record should be {expected} bytes, got {len(payload)}")
+        vehicles = [Vehicle(*_VEHICLE.unpack_from(payload, _HEADER.size + i * _VEHICLE.size))
+                    for i in range(n_cars + n_motorcycles)]
+        return cls(people_count=people_count, cars=vehicles[:n_cars], motorcycle=vehicles[n_cars:],
+                   **dict(zip(SCALAR_FIELDS, values[:-2])))
+
+    def to_record(self):
+        record = np.zeros((), dtype=HOUSEHOLD_DTYPE)
+        record['people_count'] = self.people_count
+        for name in SCALAR_FIELDS:
+            record[name] = getattr(self, name)
+        for prefix, vehicles, count in (('car', self.cars, 'n_cars'), ('motorcycle', self.motorcycle, 'n_motorcycles')):
+            record[count] = len(vehicles)
+            record[f'{prefix}_km'][:len(vehicles)] = [v.distance_km for v in vehicles]
+            # Unused slots keep an efficiency of 1 so the batch maths never divides by 0
+            efficiency = np.ones(MAX_VEHICLES)
+            efficiency[:len(vehicles)] = [v.fuel_efficiency for v in vehicles]
+            record[f'{prefix}_efficiency'] = efficiency
+        return record
+
+
+def to_records(households):
+    """Pack many households into one HOUSEHOLD_DTYPE array for batch scoring."""
+    records = np.zeros(len(households), dtype=HOUSEHOLD_DTYPE)
+    for i, household in enumerate(households):
+        records[i] = household.to_record()
+    return records
+
+
+def from_records(records):
+    households = []
+    for record in np.atleast_1d(records):
+        def vehicles(prefix, count):
+            return [Vehicle(float(km), float(eff)) for km, eff in
+                    zip(record[f'{prefix}_km'][:count], record[f'{prefix}_efficiency'][:count])]
+
+        households.append(Household(
+            people_count=int(record['people_count']),
+            cars=vehicles('car', int(record['n_cars'])),
+            motorcycle=vehicles('motorcycle', int(record['n_motorcycles'])),
+            **{name: float(record[name]) for name in SCALAR_FIELDS},
+        ))
+    return households
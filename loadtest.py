@@ -0,0 +1,167 @@
+"""Drive many concurrent browser sessions against one `streamlit run app.py`.
+
+    python loadtest.py --sessions 200 --concurrency 16
+
+Starts a single server, like a single dyno, and keeps --concurrency sessions
+in flight against it over the websocket protocol the browser uses (see
+bench_reruns.Session). Each session plays a scripted flow: add one to three
+cars, enter a 10-leg trip, switch diets three times, then open the Total tab.
+As in the browser, a widget change inside a tab reruns only that tab's
+fragment, while opening the page and switching tabs rerun the whole script.
+
+A rerun's latency runs from sending the change to the server's
+script_finished, so it includes any time the server spent on other sessions.
+Memory per session is the server's RSS growth with every session still
+connected, divided by their number (Linux only).
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from websockets.sync.client import connect
+
+from bench_reruns import Session
+from countries import load_country
+from startup_time import APP_PATH, _free_port, _wait_for_health
+
+
+def server_rss(pid):
+    # Linux only; None elsewhere
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def _add_cars(rng):
+    count = rng.randint(1, 3)
+    yield "set", "num_cars", count
+    for i in range(count):
+        yield "set", f"car_miles_{i}", rng.randrange(5000, 30000, 500)
+        yield "set", f"car_eff_{i}", round(rng.uniform(6, 18), 1)
+
+
+def _ten_leg_trip(rng):
+    airports = load_country().airports
+    yield "set", "flights_taken", "Yes"
+    yield "set", "num_legs", 10
+    for i in range(10):
+        dep, arr = rng.sample(airports, 2)
+        yield "set", f"dep_{i}", dep
+        yield "set", f"arr_{i}", arr
+
+
+def _switch_diets(rng):
+    for diet in rng.sample(load_country().diets, 3):
+        yield "click", diet
+
+
+def flow(seed):
+    """One session's interactions after opening the page: ("set", widget key, value) or ("click", button label)."""
+    rng = random.Random(seed)
+    steps = [_add_cars, _ten_leg_trip, _switch_diets]
+    rng.shuffle(steps)
+    for step in steps:
+        yield from step(rng)
+    yield "set", "active_tab", "Total"
+
+
+def play(session, seed, timeout=120):
+    """Open the page and play flow(seed); returns [(full or fragment, seconds)] per rerun."""
+    latencies = [("full", session.rerun(timeout=timeout))]
+    for kind, *args in flow(seed):
+        fragment_id = session.set(*args) if kind == "set" else session.click(*args)
+        latencies.append(("fragment" if fragment_id else "full", session.rerun(fragment_id, timeout=timeout)))
+    return latencies
+
+
+def run(seeds, concurrency, timeout=120):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless=true",
+         f"--server.port={port}", "--browser.gatherUsageStats=false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"ws://localhost:{port}/_stcore/stream"
+    try:
+        _wait_for_health(port, process, timeout)
+        # Warm up imports and caches so they don't count against the first sessions
+        with connect(url, open_timeout=timeout) as ws:
+            play(Session(ws), -1, timeout)
+        baseline = server_rss(process.pid)
+
+        connections, latencies, errors = [], [], []
+        lock = threading.Lock()
+
+        def one(seed):
+            # Left open until every session has finished, so the server still holds them all
+            ws = connect(url, open_timeout=timeout, max_size=None)
+            with lock:
+                connections.append(ws)
+            result = play(Session(ws), seed, timeout)
+            with lock:
+                latencies.append(result)
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for future in as_completed([pool.submit(one, seed) for seed in seeds]):
+                    if future.exception() is not None:
+                        errors.append(repr(future.exception()))
+            elapsed = time.perf_counter() - started
+            retained = server_rss(process.pid)
+        finally:
+            for ws in connections:
+                ws.close()
+        return {
+            "latencies": latencies,
+            "errors": errors,
+            "elapsed": elapsed,
+            "bytes_per_session": None if retained is None else (retained - baseline) / max(len(latencies), 1),
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test app.py with concurrent browser sessions.")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8, help="sessions in flight at once")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    result = run([args.seed + i for i in range(args.sessions)], args.concurrency)
+    reruns = [rerun for session in result["latencies"] for rerun in session]
+    if not reruns:
+        errors = result["errors"]
+        sys.exit(f"No session completed. First error: {errors[0] if errors else 'none'}")
+
+    completed, elapsed = len(result["latencies"]), result["elapsed"]
+    print(f"{completed}/{args.sessions} sessions, {len(reruns)} reruns in {elapsed:.1f}s "
+          f"against one server, {args.concurrency} sessions in flight")
+    for label in ("all", "fragment", "full"):
+        values = sorted(seconds * 1000 for kind, seconds in reruns if label in ("all", kind))
+        if values:
+            print(f"{label + ' reruns':<16}: p50 {_percentile(values, 50):.0f} ms, p95 {_percentile(values, 95):.0f} ms, "
+                  f"p99 {_percentile(values, 99):.0f} ms, max {values[-1]:.0f} ms ({len(values)})")
+    print(f"throughput: {len(reruns) / elapsed:.1f} reruns/s, {completed / elapsed:.2f} sessions/s")
+    if result["bytes_per_session"] is not None:
+        print(f"memory: {result['bytes_per_session'] / 1024:.0f} KiB of server RSS per connected session")
+    if result["errors"]:
+        print(f"{len(result['errors'])} sessions failed, e.g. {result['errors'][0]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Render the Total tab as a shareable PNG or PDF summary.
+
+    python report.py households.jsonl reports/ --format pdf --workers 4
+
+Each input line is a `user_data` dict (see Household.from_dict), optionally
+with an "id" used for the file name and a "country" code (Pakistan if absent).
+Ids must be unique plain file names, without path separators. A record that can't be scored is reported and skipped;
+the rest of the batch still renders.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from countries import CACHE_SIZE, DEFAULT_COUNTRY, load_country, percentile_reference
+from emissions import calculate_emissions, user_percentile
+from household import Household
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FOOTPRINT_PATH = os.path.join(BASE_DIR, "static", "footprint.png")
+
+GLOBAL_AVERAGE = 6.7 # tCO2e per capita
+
+WIDTH, HEIGHT = 1200, 760
+
+# Same palette as the Total tab
+YELLOW = "#FFD43B"
+BLACK_BOX = "#212121"
+GREY_BOX = "#636363"
+CATEGORY_COLORS = {"Household": "#1A237E", "Transport": "#1B5E20", "Secondary": "#AD1457"}
+
+# Card positions: (left, top, right, bottom)
+RESULT_BOX = (40, 150, 620, 470)
+NATIONAL_BOX = (640, 150, 900, 300)
+GLOBAL_BOX = (640, 320, 900, 470)
+SHARE_BOX = (920, 150, 1160, 300)
+PERCENTILE_BOX = (920, 320, 1160, 470)
+CATEGORY_BOXES = {
+    "Household": (40, 560, 400, 720),
+    "Transport": (420, 560, 780, 720),
+    "Secondary": (800, 560, 1160, 720),
+}
+
+FONT_CANDIDATES = {
+    False: ["DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"],
+    True: ["DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"],
+}
+
+
+@lru_cache(maxsize=None)
+def font(size, bold=False):
+    # Loaded once per process; every report reuses the same FreeType faces
+    for candidate in [os.environ.get("REPORT_FONT_BOLD" if bold else "REPORT_FONT")] + FONT_CANDIDATES[bold]:
+        if candidate:
+            try:
+                return ImageFont.truetype(candidate, size)
+            except OSError:
+                continue
+    return ImageFont.load_default(size=size)
+
+
+@lru_cache(maxsize=1)
+def footprint_watermark():
+    image = Image.open(FOOTPRINT_PATH).convert("RGBA")
+    image.thumbnail((300, 300))
+    # 10% opacity, like the .result-box::before background in the app
+    alpha = image.getchannel("A").point(lambda a: a // 10)
+    image.putalpha(alpha)
+    return image
+
+
+def _centered(draw, box, y, text, size, fill, bold=False):
+    left, _, right, _ = box
+    face = font(size, bold)
+    width = draw.textlength(text, font=face)
+    draw.text((left + (right - left - width) / 2, y), text, font=face, fill=fill)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def template(code=DEFAULT_COUNTRY):
+    """Everything that doesn't depend on the household, drawn once per process and country."""
+    country = load_country(code)
+    image = Image.new("RGB", (WIDTH, HEIGHT), "white")
+    draw = ImageDraw.Draw(image)
+    draw.text((40, 40), "Your Carbon Footprint", font=font(40, True), fill="black")
+
+    draw.rounded_rectangle(RESULT_BOX, radius=12, fill=YELLOW)
+    watermark = footprint_watermark()
+    left, top, right, bottom = RESULT_BOX
+    image.paste(watermark, (left + (right - left - watermark.width) // 2, top + (bottom - top - watermark.height) // 2), watermark)
+    _centered(draw, RESULT_BOX, top + 40, "Your Annual Carbon Footprint", 28, "black", True)
+
+    for box, title, value in ((NATIONAL_BOX, "National Average", f"{country.national_average} tCO2e"),
+                              (GLOBAL_BOX, "Global Average", f"{GLOBAL_AVERAGE} tCO2e")):
+        draw.rounded_rectangle(box, radius=12, fill=BLACK_BOX)
+        _centered(draw, box, box[1] + 20, title, 18, "white")
+        _centered(draw, box, box[1] + 55, value, 34, "white", True)
+        _centered(draw, box, box[1] + 105, "per capita", 18, "white")
+
+    draw.rounded_rectangle(SHARE_BOX, radius=12, fill=GREY_BOX)
+    _centered(draw, SHARE_BOX, SHARE_BOX[1] + 20, "Your footprint is", 18, "white")
+    _centered(draw, SHARE_BOX, SHARE_BOX[1] + 105, "of the global average", 18, "white")
+    draw.rounded_rectangle(PERCENTILE_BOX, radius=12, fill=GREY_BOX)
+    _centered(draw, PERCENTILE_BOX, PERCENTILE_BOX[1] + 20, "More than", 18, "white")
+    _centered(draw, PERCENTILE_BOX, PERCENTILE_BOX[1] + 105, f"of {country.name}'s population", 18, "white")
+
+    draw.text((40, 500), "Let's break it down...", font=font(30, True), fill="black")
+    for name, box in CATEGORY_BOXES.items():
+        draw.rounded_rectangle(box, radius=12, fill=CATEGORY_COLORS[name])
+        _centered(draw, box, box[1] + 25, name, 28, "white", True)
+    return image
+
+
+def summarize(emissions):
+    # Mirrors the three category boxes on the Total tab
+    return {
+        "Household": emissions["Household"],
+        "Transport": emissions["Cars"] + emissions["Motorcycle"] + emissions["Bus"] + emissions["Flights"],
+        "Secondary": emissions["Secondary"],
+    }
+
+
+def render_report(emissions, total, percentile, fmt="png", code=DEFAULT_COUNTRY):
+    """Return the report as PNG or PDF bytes."""
+    total = round(total, 2)
+    image = template(code).copy()
+    draw = ImageDraw.Draw(image)
+
+    _centered(draw, RESULT_BOX, RESULT_BOX[1] + 120, f"{total}", 96, "black", True)
+    _centered(draw, RESULT_BOX, RESULT_BOX[1] + 240, "tCO2e", 28, "black")
+    _centered(draw, SHARE_BOX, SHARE_BOX[1] + 50, f"{round(total / GLOBAL_AVERAGE * 100)}%", 40, "white", True)
+    _centered(draw, PERCENTILE_BOX, PERCENTILE_BOX[1] + 50, f"{min(round(percentile, 1), 99)}%", 40, "white", True)
+    for name, value in summarize(emissions).items():
+        box = CATEGORY_BOXES[name]
+        _centered(draw, box, box[1] + 75, f"{value:.2f} tCO2e", 34, "white", True)
+
+    buffer = io.BytesIO()
+    if fmt == "pdf":
+        image.save(buffer, "PDF", resolution=150)
+    elif fmt == "png":
+        image.save(buffer, "PNG", compress_level=1)
+    else:
+        raise ValueError(f"Unsupported report format: {fmt}")
+    return buffer.getvalue()
+
+
+def render_household(household, fmt="png", code=DEFAULT_COUNTRY):
+    emissions, total = calculate_emissions(household, load_country(code).factors)
+    return render_report(emissions, total, user_percentile(round(total, 2), percentile_reference(code)), fmt, code)
+
+
+def _warm_worker():
+    template()
+
+
+def _render_job(job):
+    name, data, out_dir, fmt = job
+    start = time.perf_counter()
+    try:
+        payload = render_household(Household.from_dict(data), fmt, data.get("country", DEFAULT_COUNTRY))
+        with open(os.path.join(out_dir, f"{name}.{fmt}"), "wb") as f:
+            f.write(payload)
+    except (KeyError, TypeError, ValueError, OSError) as e:
+        return name, None, f"{type(e).__name__}: {e}"
+    return name, time.perf_counter() - start, None
+
+
+def _unsafe_id(name):
+    # Ids become file names inside out_dir, so they can't name a directory
+    return name in ("", ".", "..") or "/" in name or "\\" in name
+
+
+def render_batch(records, out_dir, fmt="png", workers=None):
+    """Render one report per record into out_dir.
+
+    Returns ({id: seconds} for the reports written, {id: error} for the
+    records that couldn't be scored or written). Raises ValueError on
+    duplicate or unsafe ids, before rendering anything.
+    """
+    names = [str(data.get("id", i)) for i, data in enumerate(records)]
+    unsafe = [repr(name) for name in names if _unsafe_id(name)]
+    if unsafe:
+        raise ValueError(f"Report ids must be plain file names: {', '.join(unsafe)}")
+    duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Duplicate report ids: {', '.join(duplicates)}")
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(name, data, out_dir, fmt) for name, data in zip(names, records)]
+    latencies, errors = {}, {}
+    # Fonts, the watermark and the static template are built once per worker
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as pool:
+        chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))
+        for name, seconds, error in pool.map(_render_job, jobs, chunksize=chunksize):
+            if error is None:
+                latencies[name] = seconds
+            else:
+                errors[name] = error
+    return latencies, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render carbon footprint reports in bulk.")
+    parser.add_argument("input", help="JSON Lines file of user_data records")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", choices=["png", "pdf"], default="png")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with open(args.input, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    start = time.perf_counter()
+    try:
+        latencies, errors = render_batch(records, args.out_dir, args.format, args.workers)
+    except ValueError as e:
+        sys.exit(str(e))
+    elapsed = time.perf_counter() - start
+
+    for name, error in errors.items():
+        print(f"{name}: skipped ({error})", file=sys.stderr)
+    if not latencies:
+        print("No records to render")
+        return 1 if errors else None
+    ms = sorted(seconds * 1000 for seconds in latencies.values())
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"{len(ms)} {args.format} reports in {elapsed:.2f}s ({len(ms) / elapsed:.1f}/s)")
+    print(f"per report: mean {statistics.mean(ms):.1f} ms, p50 {statistics.median(ms):.1f} ms, p95 {p95:.1f} ms")
+    if errors:
+        print(f"{len(errors)} records skipped", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
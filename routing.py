@@ -0,0 +1,278 @@
+import bz2
+from array import array
+import gzip
+import heapq
+import math
+import os
+import sys
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROAD_GRAPH_PATH = os.environ.get("ROAD_GRAPH", os.path.join(BASE_DIR, "data", "pakistan_roads.npz"))
+# OSM roads extract build_artifacts.py turns into the graph; without one, route-based distances stay off
+ROAD_EXTRACT_PATH = os.environ.get("ROAD_EXTRACT")
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+# Half-height of the first latitude band nearest_node searches, ~5.5 km
+SNAP_BAND_DEG = 0.05
+
+# OSM highway classes that cars, motorcycles and buses actually use
+DRIVABLE_HIGHWAYS = {
+    "motorway", "motorway_link", "trunk", "trunk_link", "primary", "primary_link",
+    "secondary", "secondary_link", "tertiary", "tertiary_link", "unclassified",
+    "residential", "living_street", "service", "road",
+}
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _open_osm(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+class RoadGraph:
+    """Directed road network in CSR form: the edges leaving node i are
+    indices[indptr[i]:indptr[i + 1]] with lengths (km) in weights."""
+
+    def __init__(self, indptr, indices, weights, lat, lon):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.lat = np.asarray(lat, dtype=np.float32)
+        self.lon = np.asarray(lon, dtype=np.float32)
+        self._search_index = None
+        self._by_lat = None
+        self._routes = OrderedDict()
+        self._routes_maxsize = 4096
+        self._lock = threading.Lock()
+
+    @property
+    def num_nodes(self):
+        return len(self.lat)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    @classmethod
+    def from_edges(cls, src, dst, weights, lat, lon):
+        src = np.asarray(src, dtype=np.int64)
+        order = np.argsort(src, kind="stable")
+        counts = np.bincount(src, minlength=len(lat))
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        return cls(indptr, np.asarray(dst)[order], np.asarray(weights)[order], lat, lon)
+
+    @classmethod
+    def from_osm(cls, path):
+        """Build from an OSM XML extract (.osm, .osm.bz2 or .osm.gz).
+
+        For country-sized extracts, filter the .pbf down to roads first, e.g.
+        `osmium tags-filter pakistan-latest.osm.pbf w/highway -o roads.osm`.
+        """
+        node_ids, node_lat, node_lon = array("q"), array("d"), array("d")
+        ways = []
+        with _open_osm(path) as f:
+            root = None
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if root is None:
+                    root = elem
+                if event == "start":
+                    continue
+                if elem.tag == "node":
+                    node_ids.append(int(elem.get("id")))
+                    node_lat.append(float(elem.get("lat")))
+                    node_lon.append(float(elem.get("lon")))
+                elif elem.tag == "way":
+                    tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+                    if tags.get("highway") in DRIVABLE_HIGHWAYS:
+                        refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                        oneway = tags.get("oneway", "no")
+                        if tags.get("highway") in ("motorway", "motorway_link") and oneway == "no":
+                            oneway = "yes"
+                        ways.append((refs, oneway))
+                elif elem.tag != "relation":
+                    # <tag>/<nd> children are read when their parent closes
+                    continue
+                # Drop the finished element and the root's reference to it, so memory
+                # stays flat however large the extract is
+                elem.clear()
+                root.clear()
+
+        node_ids = np.frombuffer(node_ids, dtype=np.int64)
+        order = np.argsort(node_ids)
+        node_ids = node_ids[order]
+        node_lat = np.frombuffer(node_lat, dtype=np.float64)[order]
+        node_lon = np.frombuffer(node_lon, dtype=np.float64)[order]
+
+        src, dst = [], []
+        for refs, oneway in ways:
+            if oneway == "-1":
+                refs = refs[::-1]
+            pairs = list(zip(refs[:-1], refs[1:]))
+            src.extend(a for a, _ in pairs)
+            dst.extend(b for _, b in pairs)
+            if oneway not in ("yes", "true", "1", "-1"):
+                src.extend(b for _, b in pairs)
+                dst.extend(a for a, _ in pairs)
+
+        src_ids = np.asarray(src, dtype=np.int64)
+        dst_ids = np.asarray(dst, dtype=np.int64)
+        src = np.minimum(np.searchsorted(node_ids, src_ids), len(node_ids) - 1)
+        dst = np.minimum(np.searchsorted(node_ids, dst_ids), len(node_ids) - 1)
+        # Extracts clipped to a boundary reference nodes they don't contain
+        valid = (node_ids[src] == src_ids) & (node_ids[dst] == dst_ids)
+        src, dst = src[valid], dst[valid]
+
+        # Only keep nodes that are part of a road, renumbered 0..n-1
+        used = np.unique(np.concatenate([src, dst]))
+        remap = np.full(len(node_ids), -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        lat, lon = node_lat[used], node_lon[used]
+        src, dst = remap[src], remap[dst]
+        weights = haversine_km(lat[src], lon[src], lat[dst], lon[dst])
+        return cls.from_edges(src, dst, weights, lat, lon)
+
+    def save(self, path):
+        np.savez_compressed(path, indptr=self.indptr, indices=self.indices, weights=self.weights,
+                            lat=self.lat, lon=self.lon)
+
+    @classmethod
+    def load(cls, path=ROAD_GRAPH_PATH):
+        with np.load(path) as data:
+            return cls(data["indptr"], data["indices"], data["weights"], data["lat"], data["lon"])
+
+    def _index(self):
+        # Plain lists are much faster than numpy scalars inside the A* loop
+        if self._search_index is None:
+            with self._lock:
+                if self._search_index is None:
+                    self._search_index = (
+                        self.indptr.tolist(),
+                        self.indices.tolist(),
+                        self.weights.tolist(),
+                        np.radians(self.lat.astype(np.float64)).tolist(),
+                        np.radians(self.lon.astype(np.float64)).tolist(),
+                    )
+        return self._search_index
+
+    def _lat_order(self):
+        if self._by_lat is None:
+            with self._lock:
+                if self._by_lat is None:
+                    order = np.argsort(self.lat, kind="stable")
+                    self._by_lat = (order, self.lat[order])
+        return self._by_lat
+
+    def nearest_node(self, lat, lon):
+        # A node d km away is at least d / KM_PER_DEGREE degrees of latitude away, so
+        # once the best node in a band is within the band's reach it is the nearest
+        # overall. Ties go to the lowest index, as with a scan of every node.
+        order, sorted_lat = self._lat_order()
+        lat, lon = np.float32(lat), np.float32(lon)
+        band = SNAP_BAND_DEG
+        while True:
+            lo = int(np.searchsorted(sorted_lat, lat - band, side="left"))
+            hi = int(np.searchsorted(sorted_lat, lat + band, side="right"))
+            everything = lo == 0 and hi == len(order)
+            if hi > lo:
+                candidates = np.sort(order[lo:hi])
+                dist = haversine_km(self.lat[candidates], self.lon[candidates], lat, lon)
+                best = int(np.argmin(dist))
+                # Slack for float32 rounding in the distances
+                reach = float(dist[best]) / KM_PER_DEGREE + 1e-4
+                if reach <= band or everything:
+                    return int(candidates[best])
+                band = reach
+            elif everything:
+                raise ValueError("The road graph has no nodes")
+            else:
+                band *= 4
+
+    def shortest_path_km(self, source, target):
+        """A* over the CSR arrays; straight-line distance is an admissible
+        heuristic because every edge weight is itself a great-circle length."""
+        if source == target:
+            return 0.0
+        indptr, indices, weights, lat, lon = self._index()
+        target_lat, target_lon = lat[target], lon[target]
+        cos_target = math.cos(target_lat)
+        # Edge weights are float32, so shave the heuristic to stay admissible
+        scale = 2 * EARTH_RADIUS_KM * (1 - 1e-6)
+
+        def heuristic(node):
+            a = (math.sin((target_lat - lat[node]) / 2) ** 2
+                 + math.cos(lat[node]) * cos_target * math.sin((target_lon - lon[node]) / 2) ** 2)
+            return scale * math.asin(min(1.0, math.sqrt(a)))
+
+        best = {source: 0.0}
+        heap = [(heuristic(source), 0.0, source)]
+        closed = set()
+        while heap:
+            _, dist, node = heapq.heappop(heap)
+            if node == target:
+                return dist
+            if node in closed:
+                continue
+            closed.add(node)
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbour = indices[edge]
+                candidate = dist + weights[edge]
+                if candidate < best.get(neighbour, math.inf):
+                    best[neighbour] = candidate
+                    heapq.heappush(heap, (candidate + heuristic(neighbour), candidate, neighbour))
+        return None
+
+    def route_km(self, origin, destination):
+        """Road distance between two (lat, lon) points, or None if unconnected."""
+        source = self.nearest_node(*origin)
+        target = self.nearest_node(*destination)
+        key = (source, target)
+        with self._lock:
+            if key in self._routes:
+                self._routes.move_to_end(key)
+                return self._routes[key]
+        distance = self.shortest_path_km(source, target)
+        with self._lock:
+            self._routes[key] = distance
+            while len(self._routes) > self._routes_maxsize:
+                self._routes.popitem(last=False)
+        return distance
+
+
+def load_road_graph(path=ROAD_GRAPH_PATH):
+    return RoadGraph.load(path) if os.path.exists(path) else None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        graph = RoadGraph.from_osm(sys.argv[2])
+        graph.save(sys.argv[3])
+        print(f"{graph.num_nodes} nodes, {graph.num_edges} edges -> {sys.argv[3]}")
+    elif len(sys.argv) == 5 and sys.argv[1] == "route":
+        import time
+        from geocoding import get_geocoder
+
+        graph = RoadGraph.load(sys.argv[2])
+        geocoder = get_geocoder()
+        origin, destination = geocoder.geocode(sys.argv[3]), geocoder.geocode(sys.argv[4])
+        if origin is None or destination is None:
+            sys.exit("Couldn't find one of the places")
+        start = time.perf_counter()
+        distance = graph.route_km(origin, destination)
+        print(f"{distance:.1f} km in {(time.perf_counter() - start) * 1000:.1f} ms")
+    else:
+        sys.exit("usage: python routing.py build <extract.osm> <graph.npz>\n"
+                 "       python routing.py route <graph.npz> <from> <to>")
@@ -0,0 +1,138 @@
+"""Precomputed Secondary-category totals for every answer the Secondary tab allows.
+
+    python secondary_table.py build [country code ...]
+
+The tab has 8 clothing x 8 furniture x 8 recreation spending buckets, 5 diets
+and 0-10 new devices: 28,160 combinations. Each country's table holds the
+Secondary total (tCO₂e) of each one, so scoring an answer is a single array
+index.
+
+The file records a format version and a fingerprint of the profile values it
+was built from; if either doesn't match, load_table() rebuilds it in memory
+instead of serving stale numbers.
+"""
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+from countries import CACHE_SIZE, DEFAULT_COUNTRY, available_countries, load_country
+from emissions import SECONDARY_KEYS, calculate_emissions, secondary_components
+from household import Household
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TABLE_PATH = os.environ.get("SECONDARY_TABLE", os.path.join(BASE_DIR, "data", "secondary_table_{code}.npz"))
+
+TABLE_VERSION = 2
+MAX_DEVICES = 10
+
+# Axis order of the table, and the widget key each axis comes from in app.py
+AXES = ("clothing_range", "furniture_range", "recreation_range", "diet_type", "device_count")
+
+
+def table_shape(country):
+    buckets = len(country.spending_ranges)
+    return (buckets, buckets, buckets, len(country.diet_factors), MAX_DEVICES + 1)
+
+
+def factors_fingerprint(country):
+    factors = {
+        "spending": country.spending_ranges,
+        "diets": country.diet_factors,
+        "device": country.device_emission_factor,
+        "clothing": country.clothing_emission,
+        "per_currency": country.emission_per_currency,
+    }
+    return hashlib.sha256(json.dumps(factors, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def build_table(country):
+    amounts = np.array(list(country.spending_ranges.values()), dtype=np.float64)
+    diets = np.array(list(country.diet_factors.values()), dtype=np.float64)
+    devices = np.arange(MAX_DEVICES + 1, dtype=np.float64)
+    clothing, furniture, recreation, diet, device = np.ix_(amounts, amounts, amounts, diets, devices)
+
+    kg = secondary_components(diet, device, clothing, furniture, recreation,
+                              clothing_emission=country.clothing_emission,
+                              emission_per_currency=country.emission_per_currency,
+                              device_emission_factor=country.device_emission_factor)
+    # Summed in SECONDARY_KEYS order, like calculate_emissions, so every entry is bit-identical to it
+    total = 0
+    for key in SECONDARY_KEYS:
+        total = total + kg[key]
+    return np.ascontiguousarray(np.broadcast_to(total / 1000, table_shape(country)))
+
+
+def save_table(table, country, path=None):
+    path = path or TABLE_PATH.format(code=country.code)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez_compressed(path, table=table, version=TABLE_VERSION, fingerprint=factors_fingerprint(country))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def load_table(code=DEFAULT_COUNTRY):
+    country = load_country(code)
+    path = TABLE_PATH.format(code=code)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            if int(data["version"]) == TABLE_VERSION and str(data["fingerprint"]) == factors_fingerprint(country):
+                return data["table"]
+    return build_table(country)
+
+
+def answer_indices(state, code=DEFAULT_COUNTRY):
+    """Table index for a mapping of Secondary-tab widget keys to their values."""
+    country = load_country(code)
+    buckets = country.buckets
+    return (
+        buckets.index(state.get("clothing_range", buckets[0])),
+        buckets.index(state.get("furniture_range", buckets[0])),
+        buckets.index(state.get("recreation_range", buckets[0])),
+        country.diets.index(state.get("diet_type", "Average (mixed)")),
+        int(state.get("device_count", 0)),
+    )
+
+
+def secondary_emissions(indices, code=DEFAULT_COUNTRY):
+    """Secondary tCO₂e for one answer index, or an (n, 5) array of them."""
+    indices = np.asarray(indices)
+    return load_table(code)[tuple(np.moveaxis(indices, -1, 0))]
+
+
+def verify(table, country):
+    """Indices of every entry that differs from calculate_emissions."""
+    mismatches = []
+    buckets, diets = country.buckets, country.diets
+    for index in np.ndindex(*table_shape(country)):
+        clothing, furniture, recreation, diet, devices = index
+        kg = country.secondary_components(diets[diet], devices, buckets[clothing], buckets[furniture], buckets[recreation])
+        if calculate_emissions(Household(**kg))[0]["Secondary"] != table[index]:
+            mismatches.append(index)
+    return mismatches
+
+
+def build(code=DEFAULT_COUNTRY, path=None):
+    """Build, check against calculate_emissions, and save one country's table."""
+    country = load_country(code)
+    table = build_table(country)
+    mismatches = verify(table, country)
+    if mismatches:
+        raise ValueError(f"{code}: {len(mismatches)} entries disagree with calculate_emissions, e.g. {mismatches[0]}")
+    save_table(table, country, path)
+    return table
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "build":
+        for code in sys.argv[2:] or available_countries():
+            try:
+                table = build(code)
+            except ValueError as e:
+                sys.exit(str(e))
+            print(f"{code}: {table.size} entries ({table.nbytes // 1024} KiB), checked against calculate_emissions "
+                  f"-> {TABLE_PATH.format(code=code)}")
+    else:
+        sys.exit("usage: python secondary_table.py build [country code ...]")
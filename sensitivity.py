@@ -0,0 +1,158 @@
+"""Which inputs drive each household's footprint?
+
+    python sensitivity.py households.jsonl
+
+Each line is a `user_data` dict with an optional "country" code, as for
+report.py.
+
+calculate_emissions is linear in everything except the vehicle terms, which
+divide distance by fuel efficiency, so every partial derivative of the total
+has a closed form. Both functions here evaluate them over a whole
+HOUSEHOLD_DTYPE array at once.
+
+An elasticity is the % change in the total per 1% change in an input:
+d(total)/d(x) * x / total. Elasticities are unit-free, so they rank inputs
+measured in kWh, km and km/l against each other; households with a zero total
+get zero elasticities.
+
+Each household is scored with its own country's factors: pass a country code
+for the whole array, or one code per record.
+"""
+import json
+import sys
+
+import numpy as np
+
+from countries import DEFAULT_COUNTRY, load_country
+from emissions import FACTORS, SECONDARY_KEYS, calculate_emissions_batch
+from household import SCALAR_FIELDS, Household, to_records
+
+# Inputs the total is differentiable in; the vehicle counts are whole numbers and aren't
+INPUTS = ('people_count', *SCALAR_FIELDS, 'car_km', 'car_efficiency', 'motorcycle_km', 'motorcycle_efficiency')
+VEHICLE_PREFIXES = ('car', 'motorcycle')
+# The Secondary tab's factors, named like the Country fields they come from;
+# diet_factor is whichever diet each household picked
+SECONDARY_FACTORS = ('diet_factor', 'device_emission_factor', 'clothing_emission', 'emission_per_currency')
+
+
+def _country_factors(countries, n):
+    """{factor name: array of n} from each record's country profile."""
+    codes = np.broadcast_to(np.asarray(countries, dtype=object), (n,))
+    factors = {name: np.empty(n) for name in (*FACTORS, *SECONDARY_FACTORS[1:])}
+    for code in set(codes):
+        country = load_country(code)
+        rows = codes == code
+        for name in FACTORS:
+            factors[name][rows] = country.factors[name]
+        for name in SECONDARY_FACTORS[1:]:
+            factors[name][rows] = getattr(country, name)
+    return factors
+
+
+def _elasticities(gradients, values, total):
+    scale = np.divide(1.0, total, out=np.zeros_like(total), where=total != 0)
+    elasticities = {}
+    for name, gradient in gradients.items():
+        factor = scale[:, None] if gradient.ndim == 2 else scale
+        elasticities[name] = gradient * values[name] * factor
+    return elasticities
+
+
+def input_sensitivity(records, countries=DEFAULT_COUNTRY):
+    """Partial derivatives (tCO₂e per unit) and elasticities of the total for every input.
+
+    countries is a country code, or one per record. Returns (gradients, elasticities, total); the first two map INPUTS to arrays,
+    shaped (n, MAX_VEHICLES) for the per-vehicle fields with zeros in unused slots.
+    """
+    records = np.atleast_1d(records)
+    factors = _country_factors(countries, len(records))
+    _, total = calculate_emissions_batch(records, factors=factors)
+    people = np.maximum(records['people_count'], 1).astype(np.float64)
+    household_kg = records['electricity'] * factors['electricity'] + records['gas'] * factors['gas']
+    slots = np.arange(records['car_km'].shape[-1])
+
+    gradients = {
+        'people_count': -household_kg / people ** 2 / 1000,
+        'electricity': factors['electricity'] / people / 1000,
+        'gas': factors['gas'] / people / 1000,
+        'bus': factors['bus'] / 1000,
+        'flight_distance': factors['flights'] / 1000,
+        **{key: np.full(len(records), 1 / 1000) for key in SECONDARY_KEYS},
+    }
+    for prefix, count in zip(VEHICLE_PREFIXES, ('n_cars', 'n_motorcycles')):
+        used = slots < records[count][:, None]
+        efficiency = records[f'{prefix}_efficiency']
+        fuel = factors['fuel'][:, None]
+        gradients[f'{prefix}_km'] = np.where(used, fuel / efficiency / 1000, 0.0)
+        gradients[f'{prefix}_efficiency'] = np.where(used, -records[f'{prefix}_km'] * fuel / efficiency ** 2 / 1000, 0.0)
+
+    gradients = {name: gradients[name] for name in INPUTS}
+    values = {name: records[name].astype(np.float64) for name in INPUTS}
+    return gradients, _elasticities(gradients, values, total), total
+
+
+def factor_sensitivity(records, countries=DEFAULT_COUNTRY):
+    """Partial derivatives and elasticities of the total for every emission factor.
+
+    Returns (gradients, elasticities, total) keyed by the FACTORS entries and
+    SECONDARY_FACTORS. A factor's elasticity is the share of the total it
+    multiplies, so they sum to 1. The Secondary fields are already in kg CO₂e,
+    so the quantities behind them (devices, spending) are recovered by
+    dividing by the country's factor.
+    """
+    records = np.atleast_1d(records)
+    factors = _country_factors(countries, len(records))
+    _, total = calculate_emissions_batch(records, factors=factors)
+    people = np.maximum(records['people_count'], 1)
+    slots = np.arange(records['car_km'].shape[-1])
+
+    litres = 0
+    for prefix, count in zip(VEHICLE_PREFIXES, ('n_cars', 'n_motorcycles')):
+        used = slots < records[count][:, None]
+        litres = litres + np.where(used, records[f'{prefix}_km'] / records[f'{prefix}_efficiency'], 0.0).sum(axis=1)
+
+    gradients = {
+        'electricity': records['electricity'] / people / 1000,
+        'gas': records['gas'] / people / 1000,
+        'fuel': litres / 1000,
+        'bus': records['bus'] / 1000,
+        'flights': records['flight_distance'] / 1000,
+        'diet_factor': np.ones(len(records)),
+        'device_emission_factor': records['electronics'] / factors['device_emission_factor'] / 1000,
+        'clothing_emission': records['clothing'] / factors['clothing_emission'] / 1000,
+        'emission_per_currency': (records['furniture'] + records['recreation']) / factors['emission_per_currency'] / 1000,
+    }
+    values = {**factors, 'diet_factor': records['food'] / 1000}
+    return gradients, _elasticities(gradients, values, total), total
+
+
+def rank_inputs(elasticities):
+    """Per household, INPUTS ordered by how strongly they move the total.
+
+    Per-vehicle elasticities are summed first: scaling every car's distance
+    by 1% moves the total by the sum of the per-car elasticities.
+    Returns an (n, len(INPUTS)) array of input names.
+    """
+    columns = [elasticities[name].sum(axis=1) if elasticities[name].ndim == 2 else elasticities[name]
+               for name in INPUTS]
+    order = np.argsort(-np.abs(np.column_stack(columns)), axis=1, kind='stable')
+    return np.asarray(INPUTS)[order]
+
+
+def main(path):
+    with open(path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    records = to_records([Household.from_dict(row) for row in rows])
+    _, elasticities, _ = input_sensitivity(records, [row.get('country', DEFAULT_COUNTRY) for row in rows])
+    top = rank_inputs(elasticities)[:, 0]
+    print(f"{len(records)} households")
+    print(f"{'input':<24}{'mean elasticity':>16}{'top driver for':>16}")
+    for name in INPUTS:
+        mean = elasticities[name].sum(axis=1).mean() if elasticities[name].ndim == 2 else elasticities[name].mean()
+        print(f"{name:<24}{mean:>16.3f}{(top == name).mean():>16.0%}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python sensitivity.py households.jsonl")
+    main(sys.argv[1])
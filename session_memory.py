@@ -0,0 +1,133 @@
+"""Where does a session's memory go?
+
+    python session_memory.py --sessions 3
+
+Plays the load-test flow (see loadtest.py) through AppTest and attributes the
+bytes a session holds to session-state entries and to the payloads the app
+sends each run.
+"""
+import argparse
+import sys
+from collections import defaultdict
+
+from loadtest import flow
+from startup_time import APP_PATH
+
+# First matching prefix wins
+STATE_SOURCES = [
+    ("user_data", "Household record"),
+    ("dep_", "flight legs"),
+    ("arr_", "flight legs"),
+    ("return_", "flight legs"),
+    ("num_legs", "flight legs"),
+    ("car_", "cars"),
+    ("bike_", "motorcycles"),
+    ("bus_", "bus"),
+    ("diet_", "diet"),
+]
+
+
+def deep_sizeof(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__ if hasattr(obj, name))
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def state_source(key):
+    for prefix, source in STATE_SOURCES:
+        if str(key).startswith(prefix):
+            return source
+    return "other state"
+
+
+def session_state_breakdown(state):
+    """Bytes per source for a {key: value} session-state mapping."""
+    breakdown = defaultdict(int)
+    for key, value in state.items():
+        breakdown[state_source(key)] += deep_sizeof(key) + deep_sizeof(value)
+    return dict(breakdown)
+
+
+def payload_source(node):
+    if node.type == "markdown":
+        body = node.proto.body
+        if "data:image" in body:
+            return "inline base64 images"
+        if "<style" in body:
+            return "CSS blocks"
+        return "markdown/HTML"
+    return f"{node.type} elements"
+
+
+def payload_breakdown(root):
+    """Serialized bytes per source for every element in an AppTest tree."""
+    breakdown = defaultdict(int)
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        children = getattr(node, "children", None)
+        if children:
+            stack.extend(children.values())
+        elif getattr(node, "proto", None) is not None and node.type != "unknown":
+            breakdown[payload_source(node)] += node.proto.ByteSize()
+    return dict(breakdown)
+
+
+def play(seed):
+    """An AppTest that has opened the page and played loadtest.flow(seed)."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    for kind, *args in flow(seed):
+        if kind == "set":
+            key, value = args
+            at.session_state[key] = value
+        else:
+            next(button for button in at.button if button.label == args[0]).click()
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    return at
+
+
+def _print_table(title, breakdown):
+    total = sum(breakdown.values())
+    print(f"\n{title} — {total / 1024:.1f} KiB")
+    for source, size in sorted(breakdown.items(), key=lambda item: -item[1]):
+        print(f"  {source:<28}{size / 1024:>10.1f} KiB{size / max(total, 1):>8.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attribute per-session memory to its sources.")
+    parser.add_argument("--sessions", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    from streamlit import logger
+    logger.set_log_level("error")
+
+    state, payload = defaultdict(int), defaultdict(int)
+    for seed in range(args.sessions):
+        at = play(seed)
+        for source, size in session_state_breakdown(at.session_state.to_dict()).items():
+            state[source] += size / args.sessions
+        for source, size in payload_breakdown(at.main).items():
+            payload[source] += size / args.sessions
+
+    _print_table("Session state per session", state)
+    _print_table("Payload sent per full rerun (Total tab open)", payload)
+
+
+if __name__ == "__main__":
+    main()
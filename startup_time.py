@@ -0,0 +1,89 @@
+"""How long a fresh container takes to serve its first page.
+
+    python startup_time.py --runs 3
+
+Starts `streamlit run app.py` the way the Dockerfile does, waits for the
+health endpoint, then opens a browser-like websocket session and times the
+first rendered element ("first paint") and the end of the first script run.
+Every run starts a new server process, so nothing is warm.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.sync.client import connect
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_health(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.02)
+    raise TimeoutError(f"server not healthy after {timeout}s")
+
+
+def measure(timeout=120):
+    """Seconds from launch to (server healthy, first element, first run finished)."""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless=true",
+         f"--server.port={port}", "--browser.gatherUsageStats=false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for_health(port, process, timeout)
+        healthy = time.perf_counter() - started
+
+        first_paint = None
+        with connect(f"ws://localhost:{port}/_stcore/stream", open_timeout=timeout) as ws:
+            request = BackMsg()
+            request.rerun_script.query_string = ""
+            request.rerun_script.page_script_hash = ""
+            ws.send(request.SerializeToString())
+            while True:
+                msg = ForwardMsg()
+                msg.ParseFromString(ws.recv(timeout=timeout))
+                kind = msg.WhichOneof("type")
+                if kind == "delta" and first_paint is None:
+                    first_paint = time.perf_counter() - started
+                if kind == "script_finished":
+                    return healthy, first_paint, time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the app.")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    samples = [measure() for _ in range(args.runs)]
+    for label, values in zip(("server healthy", "first paint", "first run done"), zip(*samples)):
+        print(f"{label:<16}: median {statistics.median(values):.2f}s "
+              f"(min {min(values):.2f}s, max {max(values):.2f}s over {args.runs} cold starts)")
+
+
+if __name__ == "__main__":
+    main()
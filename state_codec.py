@@ -0,0 +1,274 @@
+"""Pack the calculator's inputs into a short, URL-safe token.
+
+A token is the version byte followed by varint/byte fields, base64url
+encoded without padding. Decoding returns widget key -> value pairs that
+can be written straight into st.session_state before the widgets render.
+"""
+import base64
+import json
+import sys
+
+from airports import AIRPORTS
+from countries import DEFAULT_COUNTRY, load_country
+from household import MAX_PEOPLE, MAX_VEHICLES
+
+QUERY_PARAM = "p"
+
+_VERSION = 1
+_AIRPORT_ORDER = list(AIRPORTS)
+_SPENDING_KEYS = ("clothing_range", "furniture_range", "recreation_range")
+
+# Widget defaults in app.py, used for anything missing from the state; the
+# spending buckets default to the first one of whichever country is selected
+DEFAULTS = {
+    "country": DEFAULT_COUNTRY,
+    "people_count": 1,
+    "is_solar": "No",
+    "solar_units": 0,
+    "electricity_units": 0,
+    "gas_m3": 0,
+    "num_cars": 0,
+    "num_bikes": 0,
+    "bus_use_routes": False,
+    "bus_km": 0,
+    "flights_taken": "No",
+    "num_legs": 1,
+    "custom_cities": False,
+    "diet_type": "Average (mixed)",
+    "device_count": 0,
+}
+_FLEETS = (("car", "num_cars", 15000, 12.0), ("bike", "num_bikes", 8000, 30.0))
+_ROUTE_TRIPS = 480
+# Widget maxima in app.py; a token may carry more, which are read past and dropped
+_MAX_ROUTES = 5
+_MAX_LEGS = 20
+
+
+class _Writer:
+    def __init__(self):
+        self.buf = bytearray([_VERSION])
+
+    def uint(self, value):
+        value = int(value)
+        if value < 0:
+            raise ValueError(f"Can't encode negative value {value}")
+        while value >= 0x80:
+            self.buf.append((value & 0x7F) | 0x80)
+            value >>= 7
+        self.buf.append(value)
+
+    def flag(self, value):
+        self.buf.append(1 if value else 0)
+
+    def text(self, value):
+        data = (value or "").encode("utf-8")
+        self.uint(len(data))
+        self.buf += data
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def byte(self):
+        if self.pos >= len(self.data):
+            raise ValueError("Profile token is truncated")
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def uint(self):
+        value = shift = 0
+        while True:
+            b = self.byte()
+            value |= (b & 0x7F) << shift
+            if not b & 0x80:
+                return value
+            shift += 7
+            if shift > 63:
+                raise ValueError("Profile token has an oversized number")
+
+    def flag(self):
+        return bool(self.byte())
+
+    def text(self):
+        length = self.uint()
+        if self.pos + length > len(self.data):
+            raise ValueError("Profile token is truncated")
+        value = self.data[self.pos:self.pos + length].decode("utf-8")
+        self.pos += length
+        return value or None
+
+
+def _write_routes(w, state, prefix):
+    n = int(state.get(f"{prefix}_num_routes", 1))
+    w.uint(n)
+    for j in range(n):
+        w.text(state.get(f"{prefix}_from_{j}"))
+        w.text(state.get(f"{prefix}_to_{j}"))
+        w.uint(state.get(f"{prefix}_trips_{j}", _ROUTE_TRIPS))
+
+
+def _read_routes(r, out, prefix):
+    n = r.uint()
+    out[f"{prefix}_num_routes"] = min(max(n, 1), _MAX_ROUTES)
+    for j in range(n):
+        route = out if j < _MAX_ROUTES else {}
+        route[f"{prefix}_from_{j}"] = r.text() or ""
+        route[f"{prefix}_to_{j}"] = r.text() or ""
+        route[f"{prefix}_trips_{j}"] = r.uint()
+
+
+def _index(options, value):
+    # 0 means "nothing selected"
+    return options.index(value) + 1 if value in options else 0
+
+
+def encode_state(state):
+    """Encode a mapping of widget keys (e.g. st.session_state) to a token."""
+    state = {**DEFAULTS, **{k: v for k, v in dict(state).items() if v is not None}}
+    country = load_country(state["country"])
+    w = _Writer()
+    w.uint(state["people_count"])
+    w.flag(state["is_solar"] == "Yes")
+    w.uint(state["solar_units"])
+    w.uint(state["electricity_units"])
+    w.uint(state["gas_m3"])
+
+    for prefix, count_key, default_km, default_eff in _FLEETS:
+        n = int(state[count_key])
+        w.uint(n)
+        for i in range(n):
+            use_routes = bool(state.get(f"{prefix}_use_routes_{i}", False))
+            w.flag(use_routes)
+            if use_routes:
+                _write_routes(w, state, f"{prefix}_{i}")
+            else:
+                w.uint(state.get(f"{prefix}_miles_{i}", default_km))
+            # Efficiency to the hundredth of a km/l, matching the widget's precision
+            w.uint(round(float(state.get(f"{prefix}_eff_{i}", default_eff)) * 100))
+
+    w.flag(state["bus_use_routes"])
+    if state["bus_use_routes"]:
+        _write_routes(w, state, "bus")
+    else:
+        w.uint(state["bus_km"])
+
+    flights = state["flights_taken"] == "Yes"
+    w.flag(flights)
+    if flights:
+        custom = bool(state["custom_cities"])
+        w.flag(custom)
+        n = int(state["num_legs"])
+        w.uint(n)
+        for i in range(n):
+            if custom:
+                w.text(state.get(f"dep_name_{i}"))
+                w.text(state.get(f"arr_name_{i}"))
+            else:
+                w.uint(_index(_AIRPORT_ORDER, state.get(f"dep_{i}")))
+                w.uint(_index(_AIRPORT_ORDER, state.get(f"arr_{i}")))
+            w.flag(state.get(f"return_{i}", True))
+
+    w.uint(_index(country.diets, state["diet_type"]))
+    w.uint(state["device_count"])
+    for key in _SPENDING_KEYS:
+        w.uint(_index(country.buckets, state.get(key, country.buckets[0])))
+    # Added after version 1 shipped: Pakistan links leave it out, so they're unchanged
+    if country.code != DEFAULT_COUNTRY:
+        w.text(country.code)
+
+    return base64.urlsafe_b64encode(bytes(w.buf)).rstrip(b"=").decode("ascii")
+
+
+def decode_state(token):
+    """Inverse of encode_state; raises ValueError on a malformed token."""
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Profile token isn't valid base64url") from e
+    if not data or data[0] != _VERSION:
+        raise ValueError("Unsupported profile token version")
+
+    r = _Reader(data)
+    r.pos = 1
+    out = {
+        "people_count": min(max(r.uint(), 1), MAX_PEOPLE),
+        "is_solar": "Yes" if r.flag() else "No",
+        "solar_units": r.uint(),
+        "electricity_units": r.uint(),
+        "gas_m3": r.uint(),
+    }
+
+    for prefix, count_key, _, _ in _FLEETS:
+        n = r.uint()
+        out[count_key] = min(n, MAX_VEHICLES)
+        for i in range(n):
+            # Vehicles past the cap are still read, to reach the fields after them
+            vehicle = out if i < MAX_VEHICLES else {}
+            use_routes = r.flag()
+            vehicle[f"{prefix}_use_routes_{i}"] = use_routes
+            if use_routes:
+                _read_routes(r, vehicle, f"{prefix}_{i}")
+            else:
+                vehicle[f"{prefix}_miles_{i}"] = r.uint()
+            vehicle[f"{prefix}_eff_{i}"] = max(r.uint() / 100, 1.0)
+
+    out["bus_use_routes"] = r.flag()
+    if out["bus_use_routes"]:
+        _read_routes(r, out, "bus")
+    else:
+        out["bus_km"] = r.uint()
+
+    flights = r.flag()
+    out["flights_taken"] = "Yes" if flights else "No"
+    if flights:
+        custom = r.flag()
+        out["custom_cities"] = custom
+        n = r.uint()
+        out["num_legs"] = min(max(n, 1), _MAX_LEGS)
+        for i in range(n):
+            leg = out if i < _MAX_LEGS else {}
+            if custom:
+                leg[f"dep_name_{i}"] = r.text() or ""
+                leg[f"arr_name_{i}"] = r.text() or ""
+            else:
+                dep, arr = r.uint(), r.uint()
+                if 0 < dep <= len(_AIRPORT_ORDER):
+                    leg[f"dep_{i}"] = _AIRPORT_ORDER[dep - 1]
+                if 0 < arr <= len(_AIRPORT_ORDER) and arr != dep:
+                    leg[f"arr_{i}"] = _AIRPORT_ORDER[arr - 1]
+            leg[f"return_{i}"] = r.flag()
+
+    diet = r.uint()
+    out["device_count"] = min(r.uint(), 10)
+    buckets = [r.uint() for _ in _SPENDING_KEYS]
+
+    country = load_country(r.text() if r.pos < len(data) else DEFAULT_COUNTRY)
+    out["country"] = country.code
+    diets = country.diets
+    out["diet_type"] = diets[diet - 1] if 0 < diet <= len(diets) else DEFAULTS["diet_type"]
+    for key, bucket in zip(_SPENDING_KEYS, buckets):
+        out[key] = country.buckets[bucket - 1] if 0 < bucket <= len(country.buckets) else country.buckets[0]
+    # Only airports the country's dropdowns offer
+    for key in [key for key in out if key.startswith(("dep_", "arr_")) and not key.startswith(("dep_name_", "arr_name_"))]:
+        if out[key] not in country.airports:
+            del out[key]
+
+    if r.pos != len(data):
+        raise ValueError("Profile token has trailing data")
+    return out
+
+
+DEFAULT_TOKEN = encode_state({})
+
+
+if __name__ == "__main__":
+    # Bulk links: one JSON object of widget values per line on stdin
+    if len(sys.argv) != 2:
+        sys.exit("usage: python state_codec.py <base-url> < profiles.jsonl")
+    base_url = sys.argv[1].rstrip("/")
+    for line in sys.stdin:
+        if line.strip():
+            print(f"{base_url}/?{QUERY_PARAM}={encode_state(json.loads(line))}")
@@ -0,0 +1,37 @@
+import numpy as np
+
+import analytics
+from emissions import calculate_emissions
+from household import Household
+
+
+def _event(household, country, diet, submission, now):
+    emissions, total = calculate_emissions(household)
+    return analytics.make_event(household, emissions, total, country, diet, submission, now=now)
+
+
+def test_report_without_partitions(tmp_path, capsys):
+    data = analytics.load(tmp_path)
+    assert len(data["total"]) == 0 and len(data["country_labels"]) == 0
+    analytics.report(tmp_path)
+    assert "No compacted events yet" in capsys.readouterr().out
+
+
+def test_compact_and_load_keep_the_latest_result_per_submission(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics, "ROTATE_GRACE", 0)
+    day = 86400 * 20000
+    analytics.record(_event(Household(electricity=100), "PK", "Vegan", 1, day), tmp_path)
+    analytics.record(_event(Household(electricity=200), "IN", "Vegetarian", 2, day), tmp_path)
+    assert analytics.compact(tmp_path) == 2
+    # A changed answer on the next day replaces submission 1's first result
+    analytics.record(_event(Household(electricity=300), "AE", "Vegan", 1, day + 86400), tmp_path)
+    assert analytics.compact(tmp_path) == 1
+
+    data = analytics.load(tmp_path)
+    assert list(data["submission"]) == [2, 1]
+    assert list(data["country_labels"][data["country"]]) == ["IN", "AE"]
+    assert list(data["electricity"]) == [200, 300]
+
+    stats = analytics.group_stats(data, "diet", "electricity")
+    assert list(stats["diet"]) == ["Vegan", "Vegetarian"]
+    assert np.allclose(stats["mean"], [300, 200])
@@ -0,0 +1,51 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import countries
+import emissions
+from countries import DEFAULT_COUNTRY, available_countries, load_country
+
+
+def test_default_profile_matches_emissions_constants():
+    pk = load_country(DEFAULT_COUNTRY)
+    assert pk.factors == emissions.FACTORS
+    assert pk.diet_factors == emissions.DIET_EMISSION_FACTORS
+    assert pk.device_emission_factor == emissions.DEVICE_EMISSION_FACTOR
+    assert pk.clothing_emission == emissions.CLOTHING_EMISSION
+    assert pk.emission_per_currency == emissions.EMISSION_PER_PKR
+    assert pk.spending_ranges == emissions.SPENDING_RANGES
+    assert pk.reference_mixture == emissions.REFERENCE_MIXTURE
+
+
+@pytest.mark.parametrize("code", sorted(available_countries()))
+def test_profiles_share_the_diet_labels(code):
+    assert load_country(code).diets == load_country(DEFAULT_COUNTRY).diets
+
+
+@pytest.mark.parametrize("code", [None, "", "XX", 7, "../../tests/fixtures/emissions_golden"])
+def test_unknown_codes_raise_value_error(code):
+    with pytest.raises(ValueError):
+        load_country(code)
+
+
+def test_profile_with_other_diets_is_rejected(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(countries.COUNTRIES_DIR, "pk.json"), tmp_path)
+    with open(os.path.join(countries.COUNTRIES_DIR, "in.json"), encoding="utf-8") as f:
+        profile = json.load(f)
+    profile["diet_factors"] = {"Pescatarian": 1.8, **profile["diet_factors"]}
+    with open(tmp_path / "in.json", "w", encoding="utf-8") as f:
+        json.dump(profile, f)
+
+    monkeypatch.setattr(countries, "COUNTRIES_DIR", str(tmp_path))
+    available_countries.cache_clear()
+    load_country.cache_clear()
+    try:
+        assert load_country(DEFAULT_COUNTRY).code == DEFAULT_COUNTRY
+        with pytest.raises(ValueError, match="same diets"):
+            load_country("IN")
+    finally:
+        available_countries.cache_clear()
+        load_country.cache_clear()
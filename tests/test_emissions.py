@@ -0,0 +1,150 @@
+"""Golden values for calculate_emissions and user_percentile.
+
+The fixtures pin the numbers the app showed before any optimisation. If a
+factor change is intended, regenerate them from the repository root with
+
+    python -m tests.test_emissions
+
+and review the diff.
+"""
+import json
+import os
+
+import pytest
+
+from countries import load_country, percentile_reference
+from emissions import CATEGORIES, calculate_emissions, user_percentile
+from household import Household, Vehicle
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "emissions_golden.json")
+
+# name -> (user_data dict, country code, whether a Household accepts it)
+CASES = {
+    "missing_keys": ({}, "PK", True),
+    "electricity_only": ({"electricity": 3600}, "PK", True),
+    "non_numeric_energy": ({"electricity": "n/a", "gas": None, "people_count": 2}, "PK", False),
+    "zero_people": ({"electricity": 1200, "gas": 300, "people_count": 0}, "PK", False),
+    # Solar generation above consumption: the dict path scores the negative net,
+    # the app clamps it to 0 before it gets here
+    "solar_surplus": ({"electricity": -2500, "gas": 400, "people_count": 2}, "PK", False),
+    "solar_surplus_clamped": ({"electricity": 0, "gas": 400, "people_count": 2}, "PK", True),
+    "parked_car": ({"cars": [{"miles_driven": 0, "fuel_efficiency": 12}]}, "PK", True),
+    "full": ({
+        "people_count": 4,
+        "electricity": 6000,
+        "gas": 1500,
+        "cars": [{"miles_driven": 12000, "fuel_efficiency": 11}, {"miles_driven": 3000, "fuel_efficiency": 8.5}],
+        "motorcycle": [{"miles_driven": 5000, "fuel_efficiency": 40}],
+        "bus": 2000,
+        "flight_distance": 5200,
+        "food": 2500,
+        "clothing": 105,
+        "electronics": 350,
+        "furniture": 13.35,
+        "recreation": 31.15,
+    }, "PK", True),
+}
+CASES["full_india"] = (CASES["full"][0], "IN", True)
+
+# total tCO₂e -> percentile against the default (Pakistan) reference
+PINNED_PERCENTILES = {
+    0: 1.0,
+    0.5: 7.742782152230971,
+    1.0: 18.22953948938201,
+    1.36: 27.57098544500119,
+    2.5: 61.09520400858983,
+    5.0: 88.40372226198997,
+    8.57: 93.31901694106418,
+    12.65: 98.72345502266762,
+    30.0: 100.0,
+}
+
+PINNED_COUNTRY_PERCENTILES = {
+    "AE": {1.0: 1.0, 2.5: 3.0266221277457235, 8.57: 27.69511084117826},
+    "BD": {1.0: 68.29064919594997, 2.5: 92.43597379392496, 8.57: 100.0},
+    "IN": {1.0: 24.029574861367838, 2.5: 70.43669131238448, 8.57: 95.85258780036969},
+    "PK": {1.0: 18.22953948938201, 2.5: 61.09520400858983, 8.57: 93.31901694106418},
+}
+
+
+def _score(name):
+    data, code, _ = CASES[name]
+    emissions, total = calculate_emissions(data, load_country(code).factors)
+    return {"emissions": emissions, "total": total}
+
+
+def _golden():
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_golden_covers_every_case():
+    assert sorted(_golden()) == sorted(CASES)
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_calculate_emissions_matches_golden(name):
+    expected = _golden()[name]
+    result = _score(name)
+    assert list(result["emissions"]) == CATEGORIES
+    for category in CATEGORIES:
+        assert result["emissions"][category] == pytest.approx(expected["emissions"][category], rel=1e-12, abs=1e-15)
+    assert result["total"] == pytest.approx(expected["total"], rel=1e-12, abs=1e-15)
+
+
+@pytest.mark.parametrize("name", sorted(name for name, (_, _, valid) in CASES.items() if valid))
+def test_household_path_matches_golden(name):
+    data, code, _ = CASES[name]
+    expected = _golden()[name]
+    emissions, total = calculate_emissions(Household.from_dict(data), load_country(code).factors)
+    for category in CATEGORIES:
+        assert emissions[category] == pytest.approx(expected["emissions"][category], rel=1e-12, abs=1e-15)
+    assert total == pytest.approx(expected["total"], rel=1e-12, abs=1e-15)
+
+
+@pytest.mark.parametrize("name", ["solar_surplus", "non_numeric_energy", "zero_people"])
+def test_household_rejects_what_the_dict_path_coerces(name):
+    with pytest.raises(ValueError):
+        Household.from_dict(CASES[name][0])
+
+
+def test_zero_fuel_efficiency():
+    data = {"cars": [{"miles_driven": 100, "fuel_efficiency": 0}]}
+    # The legacy dict path has no guard; validated input never gets that far
+    with pytest.raises(ZeroDivisionError):
+        calculate_emissions(data)
+    with pytest.raises(ValueError):
+        Household.from_dict(data)
+    with pytest.raises(ValueError):
+        Vehicle(100, 0)
+
+
+def test_unused_vehicle_slots_do_not_count():
+    household = Household(cars=[Vehicle(0, 0.5)], motorcycle=[])
+    emissions, total = calculate_emissions(household)
+    assert emissions["Cars"] == 0 and emissions["Motorcycle"] == 0 and total == 0
+
+
+@pytest.mark.parametrize("total, expected", sorted(PINNED_PERCENTILES.items()))
+def test_user_percentile_pinned(total, expected):
+    assert user_percentile(total) == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("code", sorted(PINNED_COUNTRY_PERCENTILES))
+def test_country_percentiles_pinned(code):
+    reference = percentile_reference(code)
+    for total, expected in PINNED_COUNTRY_PERCENTILES[code].items():
+        assert user_percentile(total, reference) == pytest.approx(expected, rel=1e-12)
+
+
+def test_user_percentile_floor_and_ceiling():
+    assert user_percentile(-5) == 1
+    assert user_percentile(1e6) == 100
+
+
+if __name__ == "__main__":
+    golden = {name: _score(name) for name in sorted(CASES)}
+    with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+        json.dump(golden, f, indent=2)
+        f.write("\n")
+    print(f"{len(golden)} cases -> {GOLDEN_PATH}")
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from geocoding import CoordinateCache, OfflineGeocoder, normalize, resolve_legs
+
+LAHORE = (31.5204, 74.3587)
+KARACHI = (24.8607, 67.0011)
+HYDERABAD_SINDH = (25.3960, 68.3578)
+
+
+@pytest.fixture(scope="module")
+def geocoder():
+    return OfflineGeocoder()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Lahore", LAHORE),
+    ("  lahore (LHE) ", LAHORE),
+    ("LHE", LAHORE),
+    ("Karachi Airport", KARACHI),
+    ("Lahore, Pakistan", LAHORE),
+    ("Lahore Punjab", LAHORE),
+    ("Hyderabad", HYDERABAD_SINDH),
+    ("Hyderabad, Sindh", HYDERABAD_SINDH),
+    ("Kuwait City, Kuwait", (29.3759, 47.9774)),
+    ("New York, USA", (40.7128, -74.0060)),
+    ("Lahor", LAHORE),
+])
+def test_resolves(geocoder, query, expected):
+    assert geocoder.geocode(query) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("query", [
+    # A qualifier that contradicts or isn't in the gazetteer must not fall back to a namesake
+    "Hyderabad, India",
+    "London Ontario",
+    "London, Ontario",
+    "Paris, Texas",
+    # Two different places
+    "Karachi Lahore",
+    "Atlantis",
+    "",
+])
+def test_ambiguous_or_unknown_is_none(geocoder, query):
+    assert geocoder.geocode(query) is None
+
+
+def test_cache_round_trip(tmp_path):
+    path = tmp_path / "geocode.json"
+    cache = CoordinateCache(str(path), maxsize=2)
+    cache.put("Lahore", LAHORE)
+    cache.put("Karachi", KARACHI)
+    cache.get("Lahore")
+    cache.put("Quetta", (30.1798, 66.9750))
+    cache.save()
+
+    reloaded = CoordinateCache(str(path))
+    assert "karachi" not in reloaded
+    assert reloaded.get(" LAHORE ") == LAHORE
+    assert len(reloaded) == 2
+
+
+def test_concurrent_saves_leave_a_valid_file(tmp_path):
+    path = tmp_path / "geocode.json"
+    cache = CoordinateCache(str(path))
+
+    def save(i):
+        for j in range(20):
+            cache.put(f"place {i} {j}", (i, j))
+            cache.save()
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)) == 160
+    assert [p.name for p in tmp_path.iterdir()] == ["geocode.json"]
+
+
+def test_failed_save_leaves_no_temp_file_and_retries(tmp_path, monkeypatch):
+    path = tmp_path / "geocode.json"
+    cache = CoordinateCache(str(path))
+    cache.put("Lahore", (31.5, 74.3))
+
+    def broken_dump(payload, f):
+        f.write("[")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        cache.save()
+    assert list(tmp_path.iterdir()) == []
+
+    monkeypatch.undo()
+    cache.save()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == [["lahore", [31.5, 74.3]]]
+
+
+class CountingGeocoder:
+    def __init__(self):
+        self.calls = []
+
+    def geocode(self, query):
+        self.calls.append(query)
+        if query == "boom":
+            raise OSError("backend down")
+        return {"lahore": LAHORE, "karachi": KARACHI}.get(normalize(query))
+
+
+def test_resolve_legs_looks_each_name_up_once(tmp_path):
+    geocoder = CountingGeocoder()
+    cache = CoordinateCache(str(tmp_path / "geocode.json"))
+    legs = [("Lahore", "Karachi"), ("karachi", "LAHORE"), ("Lahore", "boom")]
+    assert asyncio.run(resolve_legs(legs, geocoder, cache)) == [(LAHORE, KARACHI), (KARACHI, LAHORE), (LAHORE, None)]
+    assert sorted(geocoder.calls) == ["Karachi", "Lahore", "boom"]
+
+    asyncio.run(resolve_legs(legs, geocoder, cache))
+    assert sorted(geocoder.calls) == ["Karachi", "Lahore", "boom", "boom"]
@@ -0,0 +1,29 @@
+import pytest
+
+from household import MAX_PEOPLE, MAX_VEHICLES, Household, Vehicle
+
+
+def test_bytes_round_trip_at_the_limits():
+    household = Household(people_count=MAX_PEOPLE, electricity=1e9, cars=[Vehicle(1, 0.5)] * MAX_VEHICLES)
+    assert Household.from_bytes(household.to_bytes()) == household
+
+
+@pytest.mark.parametrize("people_count", [0, MAX_PEOPLE + 1, 2.5])
+def test_people_count_out_of_range(people_count):
+    with pytest.raises(ValueError):
+        Household(people_count=people_count)
+
+
+def test_validate_catches_fields_set_after_construction():
+    household = Household()
+    household.people_count = MAX_PEOPLE + 1
+    with pytest.raises(ValueError):
+        household.validate()
+    household.people_count = 2
+    household.gas = -1
+    with pytest.raises(ValueError):
+        household.validate()
+    household.gas = 3
+    household.cars = [Vehicle(1, 1)] * (MAX_VEHICLES + 1)
+    with pytest.raises(ValueError):
+        household.validate()
@@ -0,0 +1,164 @@
+"""Every fast path must agree with the scalar calculate_emissions reference."""
+import math
+
+import numpy as np
+import pytest
+from hypothesis import given, settings, strategies as st
+
+import secondary_table
+from countries import available_countries, load_country, percentile_reference, save_percentile_table
+from emissions import CATEGORIES, calculate_emissions, calculate_emissions_batch, reference_distribution, user_percentile
+from household import MAX_VEHICLES, SCALAR_FIELDS, Household, Vehicle, from_records, to_records
+
+CODES = sorted(available_countries())
+
+amounts = st.floats(min_value=0, max_value=1e6, allow_nan=False, allow_infinity=False)
+vehicles = st.lists(
+    st.builds(Vehicle, st.floats(min_value=0, max_value=1e5), st.floats(min_value=0.1, max_value=100)),
+    max_size=MAX_VEHICLES,
+)
+households = st.builds(
+    Household,
+    people_count=st.integers(min_value=1, max_value=50),
+    cars=vehicles,
+    motorcycle=vehicles,
+    **{name: amounts for name in SCALAR_FIELDS},
+)
+
+
+def _close(a, b):
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+
+
+def _answers(code):
+    country = load_country(code)
+    buckets = st.integers(min_value=0, max_value=len(country.buckets) - 1)
+    return st.tuples(buckets, buckets, buckets, st.integers(min_value=0, max_value=len(country.diets) - 1),
+                     st.integers(min_value=0, max_value=secondary_table.MAX_DEVICES))
+
+
+def _scalar_secondary(index, code):
+    country = load_country(code)
+    clothing, furniture, recreation, diet, devices = index
+    kg = country.secondary_components(country.diets[diet], devices, country.buckets[clothing],
+                                      country.buckets[furniture], country.buckets[recreation])
+    return calculate_emissions(Household(**kg), country.factors)[0]["Secondary"]
+
+
+@given(households, st.sampled_from(CODES))
+def test_dict_path_matches_household_path(household, code):
+    factors = load_country(code).factors
+    emissions, total = calculate_emissions(household, factors)
+    legacy, legacy_total = calculate_emissions(household.to_dict(), factors)
+    for category in CATEGORIES:
+        assert _close(emissions[category], legacy[category])
+    assert _close(total, legacy_total)
+
+
+@given(st.lists(households, min_size=1, max_size=20), st.sampled_from(CODES))
+def test_batch_matches_scalar(batch, code):
+    factors = load_country(code).factors
+    emissions, totals = calculate_emissions_batch(to_records(batch), factors=factors)
+    for i, household in enumerate(batch):
+        expected, expected_total = calculate_emissions(household, factors)
+        for category in CATEGORIES:
+            assert _close(emissions[category][i], expected[category])
+        assert _close(totals[i], expected_total)
+
+
+@given(st.lists(households, max_size=5))
+def test_records_round_trip(batch):
+    assert from_records(to_records(batch)) == batch
+
+
+@settings(deadline=None)
+@given(st.data(), st.sampled_from(CODES))
+def test_lookup_table_matches_scalar(data, code):
+    index = data.draw(_answers(code))
+    # The table is built to be bit-identical, not just close
+    assert secondary_table.secondary_emissions(index, code) == _scalar_secondary(index, code)
+
+
+@settings(deadline=None)
+@given(st.data(), st.sampled_from(CODES))
+def test_lookup_table_batch_matches_scalar(data, code):
+    indices = data.draw(st.lists(_answers(code), min_size=1, max_size=20))
+    looked_up = secondary_table.secondary_emissions(np.array(indices), code)
+    assert list(looked_up) == [_scalar_secondary(index, code) for index in indices]
+
+
+@settings(deadline=None)
+@given(st.data(), st.sampled_from(CODES))
+def test_batch_with_table_secondary_matches_scalar(data, code):
+    country = load_country(code)
+    indices = data.draw(st.lists(_answers(code), min_size=1, max_size=10))
+    batch = []
+    for clothing, furniture, recreation, diet, devices in indices:
+        kg = country.secondary_components(country.diets[diet], devices, country.buckets[clothing],
+                                          country.buckets[furniture], country.buckets[recreation])
+        batch.append(Household(people_count=data.draw(st.integers(1, 10)), electricity=data.draw(amounts), **kg))
+    secondary = secondary_table.secondary_emissions(np.array(indices), code)
+    _, totals = calculate_emissions_batch(to_records(batch), secondary=secondary, factors=country.factors)
+    for household, total in zip(batch, totals):
+        assert _close(total, calculate_emissions(household, country.factors)[1])
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_saved_lookup_table_matches_built(code, tmp_path, monkeypatch):
+    path = tmp_path / f"secondary_table_{code}.npz"
+    secondary_table.build(code, str(path))
+    monkeypatch.setattr(secondary_table, "TABLE_PATH", str(tmp_path / "secondary_table_{code}.npz"))
+    secondary_table.load_table.cache_clear()
+    try:
+        assert np.array_equal(secondary_table.load_table(code), secondary_table.build_table(load_country(code)))
+    finally:
+        secondary_table.load_table.cache_clear()
+
+
+def test_stale_lookup_table_is_rebuilt(tmp_path, monkeypatch):
+    country = load_country("PK")
+    np.savez(tmp_path / "secondary_table_PK.npz", table=np.zeros(secondary_table.table_shape(country)),
+             version=secondary_table.TABLE_VERSION, fingerprint="0" * 16)
+    monkeypatch.setattr(secondary_table, "TABLE_PATH", str(tmp_path / "secondary_table_{code}.npz"))
+    secondary_table.load_table.cache_clear()
+    try:
+        assert np.array_equal(secondary_table.load_table("PK"), secondary_table.build_table(country))
+    finally:
+        secondary_table.load_table.cache_clear()
+
+
+def _rank_percentile(total, population):
+    # scipy.stats.percentileofscore(kind='rank'), written out on unsorted data
+    below = np.count_nonzero(population < total)
+    at_or_below = np.count_nonzero(population <= total)
+    return max((below + at_or_below + (at_or_below > below)) * 50.0 / len(population), 1)
+
+
+@settings(deadline=None)
+@given(st.one_of(st.floats(min_value=-5, max_value=40), st.sampled_from([0.9, 2.1, 9.0])))
+def test_user_percentile_matches_rank_definition(total):
+    population = reference_distribution()
+    shuffled = np.random.default_rng(0).permutation(population)
+    assert user_percentile(total) == pytest.approx(_rank_percentile(total, shuffled), rel=1e-12)
+
+
+@settings(deadline=None)
+@given(st.floats(min_value=0, max_value=40), st.floats(min_value=0, max_value=40))
+def test_user_percentile_is_monotonic(a, b):
+    low, high = sorted((a, b))
+    assert user_percentile(low) <= user_percentile(high)
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_cached_percentile_reference_matches_fresh(code, tmp_path, monkeypatch):
+    country = load_country(code)
+    fresh = reference_distribution(country.reference_mixture, country.reference_seed)
+    assert np.array_equal(percentile_reference(code), fresh)
+
+    monkeypatch.setattr("countries.PERCENTILE_TABLE_PATH", str(tmp_path / "percentile_table_{code}.npz"))
+    save_percentile_table(code)
+    percentile_reference.cache_clear()
+    try:
+        assert np.array_equal(percentile_reference(code), fresh)
+    finally:
+        percentile_reference.cache_clear()
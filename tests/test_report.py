@@ -0,0 +1,47 @@
+import pytest
+
+from household import Household
+from report import render_batch, render_household
+
+
+def test_render_household_formats():
+    household = Household(electricity=3600)
+    assert render_household(household, "png").startswith(b"\x89PNG")
+    assert render_household(household, "pdf", "IN").startswith(b"%PDF")
+    with pytest.raises(ValueError):
+        render_household(household, "gif")
+
+
+def test_bad_records_are_reported_without_stopping_the_batch(tmp_path):
+    records = [
+        {"id": "ok", "electricity": 1200},
+        {"id": "negative", "gas": -5},
+        {"id": "zero-efficiency", "cars": [{"miles_driven": 100, "fuel_efficiency": 0}]},
+        {"id": "no-distance", "cars": [{"fuel_efficiency": 10}]},
+        {"id": "unknown-country", "country": "XX"},
+        {"electricity": 10},
+    ]
+    latencies, errors = render_batch(records, tmp_path, workers=2)
+    assert sorted(latencies) == ["5", "ok"]
+    assert sorted(errors) == ["negative", "no-distance", "unknown-country", "zero-efficiency"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["5.png", "ok.png"]
+
+
+def test_duplicate_ids_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="a, b"):
+        render_batch([{"id": "a"}, {"id": "b"}, {"id": "a"}, {"id": "c"}, {"id": "b"}], tmp_path / "out")
+    assert not (tmp_path / "out").exists()
+
+
+@pytest.mark.parametrize("name", ["../escaped", "sub/x", "..", "", "a\\b"])
+def test_ids_that_are_not_file_names_are_rejected(tmp_path, name):
+    with pytest.raises(ValueError, match="plain file names"):
+        render_batch([{"id": "ok"}, {"id": name}], tmp_path / "out")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_write_errors_are_reported_per_record(tmp_path):
+    (tmp_path / "taken.png").mkdir()
+    latencies, errors = render_batch([{"id": "ok"}, {"id": "taken"}], tmp_path, workers=1)
+    assert list(latencies) == ["ok"]
+    assert list(errors) == ["taken"] and errors["taken"].startswith("IsADirectoryError")
@@ -0,0 +1,73 @@
+import bz2
+
+import numpy as np
+import pytest
+
+from routing import RoadGraph, haversine_km
+
+# Four nodes on a line of longitude, ~11 km apart, plus one the extract clips off
+OSM = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <bounds minlat="31.0" minlon="74.0" maxlat="31.4" maxlon="74.1"/>
+  <node id="10" lat="31.0" lon="74.0"/>
+  <node id="20" lat="31.1" lon="74.0"><tag k="name" v="junction"/></node>
+  <node id="30" lat="31.2" lon="74.0"/>
+  <node id="40" lat="31.3" lon="74.0"/>
+  <node id="50" lat="31.4" lon="74.1"/>
+  <way id="1">
+    <nd ref="10"/><nd ref="20"/><nd ref="30"/>
+    <tag k="highway" v="primary"/>
+  </way>
+  <way id="2">
+    <nd ref="30"/><nd ref="40"/>
+    <tag k="highway" v="residential"/><tag k="oneway" v="yes"/>
+  </way>
+  <way id="3">
+    <nd ref="40"/><nd ref="99"/>
+    <tag k="highway" v="primary"/>
+  </way>
+  <way id="4">
+    <nd ref="40"/><nd ref="50"/>
+    <tag k="highway" v="footway"/>
+  </way>
+  <relation id="5"><member type="way" ref="1" role=""/><tag k="type" v="route"/></relation>
+</osm>
+"""
+
+
+@pytest.fixture(params=["roads.osm", "roads.osm.bz2"])
+def graph(request, tmp_path):
+    path = tmp_path / request.param
+    data = OSM.encode("utf-8")
+    path.write_bytes(bz2.compress(data) if request.param.endswith(".bz2") else data)
+    return RoadGraph.from_osm(str(path))
+
+
+def test_from_osm_keeps_only_drivable_roads(graph):
+    # The footway and the edge to the clipped node are dropped
+    assert graph.num_nodes == 4
+    assert graph.num_edges == 5
+
+
+def test_oneway_is_respected(graph):
+    south, north = graph.nearest_node(31.0, 74.0), graph.nearest_node(31.3, 74.0)
+    assert graph.shortest_path_km(south, north) == pytest.approx(float(haversine_km(31.0, 74.0, 31.3, 74.0)), rel=1e-5)
+    assert graph.shortest_path_km(north, south) is None
+
+
+def test_route_km_round_trips_through_save(graph, tmp_path):
+    graph.save(tmp_path / "graph.npz")
+    loaded = RoadGraph.load(tmp_path / "graph.npz")
+    assert loaded.route_km((31.0, 74.0), (31.2, 74.0)) == pytest.approx(graph.route_km((31.01, 74.0), (31.19, 74.0)))
+
+
+def test_nearest_node_matches_a_full_scan():
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(24, 37, 20000), rng.uniform(61, 77, 20000)
+    # A duplicated node: ties go to the lower index
+    lat[7], lon[7] = lat[3], lon[3]
+    graph = RoadGraph(np.zeros(len(lat) + 1, dtype=np.int64), [], [], lat, lon)
+    queries = [(rng.uniform(20, 40), rng.uniform(58, 80)) for _ in range(200)] + [(0, 0), (lat[3], lon[3])]
+    for query in queries:
+        scan = int(np.argmin(haversine_km(graph.lat, graph.lon, np.float32(query[0]), np.float32(query[1]))))
+        assert graph.nearest_node(*query) == scan
@@ -0,0 +1,126 @@
+"""The closed-form gradients must agree with finite differences of calculate_emissions_batch."""
+import dataclasses
+
+import numpy as np
+import pytest
+
+from countries import available_countries, load_country
+from emissions import calculate_emissions_batch
+from household import HOUSEHOLD_DTYPE, MAX_VEHICLES
+from sensitivity import INPUTS, SECONDARY_FACTORS, factor_sensitivity, input_sensitivity, rank_inputs
+
+CODES = sorted(available_countries())
+# people_count is an integer field; a float copy lets it take a small step
+FLOAT_DTYPE = np.dtype([(name, '<f8' if name == 'people_count' else HOUSEHOLD_DTYPE[name])
+                        for name in HOUSEHOLD_DTYPE.names])
+
+
+def _answers(country, n, seed=0):
+    rng = np.random.RandomState(seed)
+    return [(country.diets[rng.randint(len(country.diets))], rng.randint(11),
+             *(country.buckets[i] for i in rng.randint(len(country.buckets), size=3))) for _ in range(n)]
+
+
+def _households(country, answers, seed=0):
+    rng = np.random.RandomState(seed)
+    n = len(answers)
+    records = np.zeros(n, dtype=HOUSEHOLD_DTYPE)
+    records['people_count'] = rng.randint(1, 8, size=n)
+    for name in ('electricity', 'gas', 'bus', 'flight_distance'):
+        records[name] = rng.uniform(0, 5000, size=n)
+    for prefix, count in (('car', 'n_cars'), ('motorcycle', 'n_motorcycles')):
+        records[count] = rng.randint(0, MAX_VEHICLES + 1, size=n)
+        records[f'{prefix}_km'] = rng.uniform(0, 20000, size=(n, MAX_VEHICLES))
+        records[f'{prefix}_efficiency'] = rng.uniform(5, 50, size=(n, MAX_VEHICLES))
+    _set_secondary(records, country, answers)
+    return records
+
+
+def _set_secondary(records, country, answers):
+    for i, answer in enumerate(answers):
+        for key, kg in country.secondary_components(*answer).items():
+            records[key][i] = kg
+
+
+def _difference(factors, records, name, step, slot=None):
+    # One person is the floor calculate_emissions clamps to, so people_count only steps up
+    signs = (1, 0) if name == 'people_count' else (1, -1)
+    bumped = {}
+    for sign in signs:
+        shifted = records.astype(FLOAT_DTYPE)
+        if slot is None:
+            shifted[name] += sign * step
+        else:
+            shifted[name][:, slot] += sign * step
+        bumped[sign] = calculate_emissions_batch(shifted, factors=factors)[1]
+    return (bumped[1] - bumped[signs[1]]) / ((1 - signs[1]) * step)
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_input_gradients_match_finite_differences(code):
+    country = load_country(code)
+    records = _households(country, _answers(country, 50))
+    gradients, _, _ = input_sensitivity(records, code)
+    for name in INPUTS:
+        if gradients[name].ndim == 2:
+            for slot in range(MAX_VEHICLES):
+                expected = _difference(country.factors, records, name, 1e-3, slot)
+                used = slot < records['n_cars' if name.startswith('car') else 'n_motorcycles']
+                np.testing.assert_allclose(gradients[name][:, slot], np.where(used, expected, 0.0), rtol=1e-5, atol=1e-12)
+        else:
+            expected = _difference(country.factors, records, name, 1e-6 if name == 'people_count' else 1e-3)
+            np.testing.assert_allclose(gradients[name], expected, rtol=1e-5, atol=1e-12, err_msg=name)
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_factor_gradients_match_finite_differences(code):
+    country = load_country(code)
+    answers = _answers(country, 50)
+    records = _households(country, answers)
+    gradients, elasticities, total = factor_sensitivity(records, code)
+
+    def total_with(changed):
+        shifted = records.copy()
+        _set_secondary(shifted, changed, answers)
+        return calculate_emissions_batch(shifted, factors=changed.factors)[1]
+
+    step = 1e-6
+    for name in (*country.factors, *SECONDARY_FACTORS):
+        bumped = {}
+        for sign in (1, -1):
+            if name in country.factors:
+                changed = dataclasses.replace(country, factors={**country.factors, name: country.factors[name] + sign * step})
+            elif name == 'diet_factor':
+                changed = dataclasses.replace(country, diet_factors={diet: factor + sign * step
+                                                                     for diet, factor in country.diet_factors.items()})
+            else:
+                changed = dataclasses.replace(country, **{name: getattr(country, name) + sign * step})
+            bumped[sign] = total_with(changed)
+        expected = (bumped[1] - bumped[-1]) / (2 * step)
+        np.testing.assert_allclose(gradients[name], expected, rtol=1e-5, atol=1e-9, err_msg=name)
+
+    np.testing.assert_allclose(sum(elasticities.values()), 1.0)
+
+
+def test_each_record_uses_its_own_country():
+    records = _households(load_country("PK"), _answers(load_country("PK"), 2 * len(CODES)))
+    codes = CODES * 2
+    gradients, _, total = factor_sensitivity(records, codes)
+    for i, code in enumerate(codes):
+        alone, _, alone_total = factor_sensitivity(records[i], code)
+        assert total[i] == alone_total[0]
+        for name in gradients:
+            assert gradients[name][i] == alone[name][0]
+
+
+def test_rank_inputs_orders_by_elasticity():
+    records = np.zeros(1, dtype=HOUSEHOLD_DTYPE)
+    records['people_count'] = 1
+    records['electricity'] = 1000
+    records['bus'] = 10
+    records['car_efficiency'] = records['motorcycle_efficiency'] = 1
+    _, elasticities, _ = input_sensitivity(records)
+    ranked = list(rank_inputs(elasticities)[0])
+    # Splitting the bill over more people cuts it exactly as much as using more raises it
+    assert sorted(ranked[:2]) == ['electricity', 'people_count']
+    assert ranked[2] == 'bus'
@@ -0,0 +1,68 @@
+import base64
+
+import pytest
+
+from household import MAX_PEOPLE, MAX_VEHICLES
+from state_codec import DEFAULT_TOKEN, decode_state, encode_state
+
+
+def test_default_token_is_stable():
+    assert DEFAULT_TOKEN == encode_state({})
+    assert encode_state(decode_state(DEFAULT_TOKEN)) == DEFAULT_TOKEN
+
+
+def test_round_trip():
+    state = {
+        "people_count": 4, "electricity_units": 6000, "gas_m3": 1500,
+        "num_cars": 2, "car_miles_0": 12000, "car_eff_0": 11.0, "car_miles_1": 3000, "car_eff_1": 8.5,
+        "bus_use_routes": True, "bus_num_routes": 2, "bus_from_0": "Rawalpindi", "bus_to_0": "Islamabad",
+        "bus_trips_0": 400, "bus_from_1": "Lahore", "bus_to_1": "Kasur", "bus_trips_1": 20,
+        "flights_taken": "Yes", "num_legs": 2, "custom_cities": True,
+        "dep_name_0": "Lahore", "arr_name_0": "Dubai", "return_0": True,
+        "dep_name_1": "Karachi", "arr_name_1": "London", "return_1": False,
+        "diet_type": "Vegan", "device_count": 3, "clothing_range": "5,000 - 10,000 PKR",
+    }
+    decoded = decode_state(encode_state(state))
+    assert {key: decoded[key] for key in state} == state
+    assert encode_state(decoded) == encode_state(state)
+
+
+def test_oversized_counts_only_fill_the_widgets_that_exist():
+    state = {
+        "people_count": 70000,
+        "num_cars": MAX_VEHICLES + 3,
+        "bus_use_routes": True, "bus_num_routes": 7,
+        "flights_taken": "Yes", "custom_cities": True, "num_legs": 25,
+        **{f"dep_name_{i}": f"from {i}" for i in range(25)},
+        **{f"arr_name_{i}": f"to {i}" for i in range(25)},
+        "diet_type": "Vegan",
+    }
+    decoded = decode_state(encode_state(state))
+    assert decoded["people_count"] == MAX_PEOPLE
+    assert decoded["num_cars"] == MAX_VEHICLES
+    assert f"car_miles_{MAX_VEHICLES}" not in decoded
+    assert decoded["bus_num_routes"] == 5 and "bus_from_5" not in decoded
+    assert decoded["num_legs"] == 20
+    assert decoded["dep_name_19"] == "from 19"
+    assert not any(key.endswith(("_20", "_21", "_24")) for key in decoded)
+    # Fields after the dropped entries are still read correctly
+    assert decoded["diet_type"] == "Vegan"
+
+
+def _with_country(code):
+    # DEFAULT_TOKEN with a country code appended, the way encode_state writes one
+    data = base64.urlsafe_b64decode(DEFAULT_TOKEN + "=" * (-len(DEFAULT_TOKEN) % 4))
+    data += bytes([len(code)]) + code.encode("utf-8")
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def test_country_codes_round_trip():
+    assert decode_state(_with_country("IN"))["country"] == "IN"
+
+
+@pytest.mark.parametrize("token", ["", "!!!", "AA", DEFAULT_TOKEN[:-4], DEFAULT_TOKEN + "AAAA",
+                                   "AQEAAIgnAAAAAAABAAECDwEDAAEBAQA", _with_country("XX"),
+                                   _with_country("../../tests/fixtures/emissions_golden")])
+def test_malformed_tokens_raise_value_error(token):
+    with pytest.raises(ValueError):
+        decode_state(token)